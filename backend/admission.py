@@ -0,0 +1,198 @@
+"""Admission control (load shedding) for the estimate routes.
+
+At most WYCENAPPKA_MAX_IN_FLIGHT slots are in use at once and at most
+WYCENAPPKA_MAX_QUEUE more requests wait for slots. A request takes one slot
+per ROWS_PER_SLOT rows it predicts (batch rows, grid cells), so a large
+batch counts as many single estimates. Every request gets a deadline of
+WYCENAPPKA_REQUEST_TIMEOUT_MS (clients can ask for less with the
+X-Request-Timeout-Ms header). A request is answered right away with 503
+and Retry-After when the queue is full, when the expected wait is longer
+than its deadline or when the deadline passes while it waits or runs, so
+under a spike some requests fail fast instead of all of them timing out.
+"""
+
+import asyncio
+import math
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable
+
+from fastapi import Request
+
+from metrics import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE,
+    ADMISSION_REJECTED,
+    ADMISSION_WAIT_SECONDS,
+    add_mark,
+)
+
+TIMEOUT_HEADER = "X-Request-Timeout-Ms"
+
+# Rows predicted for the price of one /estimate, about one scheduler batch
+ROWS_PER_SLOT = 64
+
+
+class OverloadedError(RuntimeError):
+    """Request shed by admission control, answered with 503 and Retry-After."""
+
+    status_code = 503
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server overloaded ({reason}), retry later")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def slots_for_rows(rows: int) -> int:
+    return max(1, math.ceil(rows / ROWS_PER_SLOT))
+
+
+class AdmissionController:
+    """Bounded number of slots in use, with a bounded FIFO queue.
+
+    A request can take several slots (at most all of them). The expected
+    wait is estimated from the average time a slot is held (moving average)
+    and the slots queued ahead, so requests that would miss their deadline
+    anyway are rejected before they queue.
+    """
+
+    def __init__(self, max_in_flight: int = 64, max_queue: int = 256, timeout: float = 1.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self.queued = 0
+        # Slots requested by the queued requests
+        self.queued_slots = 0
+        self._service_time = 0.01
+        self._available = max_in_flight
+        self._waiters: deque[tuple[int, asyncio.Future]] = deque()
+
+    def _expected_wait(self, slots: int) -> float:
+        return slots * self._service_time / self.max_in_flight
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue should be drained, at least 1."""
+        return max(1, math.ceil(self._expected_wait(self.queued_slots + 1)))
+
+    def reject(self, route: str, reason: str) -> OverloadedError:
+        ADMISSION_REJECTED.inc(route=route, reason=reason)
+        return OverloadedError(reason, self.retry_after())
+
+    def check_deadline(self, route: str, deadline: float) -> None:
+        """Reject a request whose deadline passed while it was being handled."""
+        if asyncio.get_running_loop().time() > deadline:
+            raise self.reject(route, "deadline")
+
+    def _release(self, slots: int) -> None:
+        self._available += slots
+        # Wake waiters in order, a large request holds back the ones after it
+        while self._waiters:
+            needed, future = self._waiters[0]
+            if future.done():
+                # Timed out
+                self._waiters.popleft()
+                continue
+            if needed > self._available:
+                break
+            self._waiters.popleft()
+            self._available -= needed
+            future.set_result(None)
+
+    async def _acquire(self, route: str, slots: int, timeout: float) -> None:
+        if not self._waiters and self._available >= slots:
+            # Free slots, acquired without waiting
+            self._available -= slots
+            return
+        if self.queued >= self.max_queue:
+            raise self.reject(route, "queue_full")
+        if self._expected_wait(self.queued_slots + slots) > timeout:
+            raise self.reject(route, "deadline")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((slots, future))
+        self.queued += 1
+        self.queued_slots += slots
+        ADMISSION_QUEUE.set(self.queued)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Granted just as the wait timed out
+                self._release(slots)
+            raise self.reject(route, "deadline")
+        finally:
+            self.queued -= 1
+            self.queued_slots -= slots
+            ADMISSION_QUEUE.set(self.queued)
+
+    @asynccontextmanager
+    async def slot(self, route: str, timeout: float | None = None, slots: int = 1):
+        """Hold `slots` slots for the body of the `async with`, yields the deadline.
+
+        The deadline is in event loop time (`loop.time()`, which is
+        `time.monotonic()`), e.g. for InferenceScheduler.predict.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        deadline = start + timeout
+        slots = max(1, min(slots, self.max_in_flight))
+
+        await self._acquire(route, slots, timeout)
+        admitted = loop.time()
+        ADMISSION_WAIT_SECONDS.observe(admitted - start, route=route)
+        # Not part of the validation stage of TimedRoute
+        add_mark("admission_wait", admitted - start)
+        self.in_flight += slots
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        try:
+            yield deadline
+        finally:
+            self.in_flight -= slots
+            ADMISSION_IN_FLIGHT.set(self.in_flight)
+            self._release(slots)
+            held = (loop.time() - admitted) / slots
+            self._service_time += 0.1 * (held - self._service_time)
+
+
+admission = AdmissionController(
+    max_in_flight=int(os.environ.get("WYCENAPPKA_MAX_IN_FLIGHT", "64")),
+    max_queue=int(os.environ.get("WYCENAPPKA_MAX_QUEUE", "256")),
+    timeout=float(os.environ.get("WYCENAPPKA_REQUEST_TIMEOUT_MS", "1000")) / 1000,
+)
+
+
+def _timeout(request: Request) -> float | None:
+    timeout = request.headers.get(TIMEOUT_HEADER)
+    try:
+        return float(timeout) / 1000 if timeout else None
+    except ValueError:
+        return None
+
+
+async def admit(request: Request):
+    """Route dependency: wait for a slot, the value is the request deadline."""
+    async with admission.slot(request.url.path, _timeout(request)) as deadline:
+        yield deadline
+
+
+def admit_rows(rows: Callable[[Any], int]):
+    """Route dependency like `admit`, taking slots for `rows(json body)` rows.
+
+    FastAPI reads the body before solving dependencies, so it is only
+    parsed once. Bodies that aren't valid are charged one slot (they are
+    rejected with 422 anyway).
+    """
+
+    async def admit_rows(request: Request):
+        try:
+            slots = slots_for_rows(rows(await request.json()))
+        except (ValueError, TypeError, AttributeError):
+            slots = 1
+        async with admission.slot(request.url.path, _timeout(request), slots) as deadline:
+            yield deadline
+
+    return admit_rows
@@ -0,0 +1,147 @@
+"""Micro-benchmark of request encoding (EstimateInput -> model row).
+
+Compares the encoder compiled at model load with the previous per-request
+implementation, which re-validated the schema, rebuilt the translation
+dictionary and scanned category mappings on every call.
+
+Run from the backend directory:
+
+    $ python -m benchmarks.encode --iterations 20000
+    $ python -m benchmarks.encode --dummy-model
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from model import Model
+from model.encoder import (
+    CONSTANT_INPUTS,
+    GEOCODED_FEATURES,
+    IMPUTED_INPUTS,
+    translate,
+    validate_schema,
+)
+from schemas.estimate import EstimateInput
+
+SAMPLE_INPUT = {
+    "location": "Lea",
+    "city": "Kraków",
+    "district": "Krowodrza",
+    "area": 54.5,
+    "rooms": 3,
+    "floor": 2,
+    "floorsInBuilding": 4,
+    "balcony": True,
+    "separate_kitchen": False,
+    "state": "Do zamieszkania",
+    "market": "Wtórny",
+    "ad_type": "prywatny",
+    "ownership": "Własnościowe",
+    "heating": "miejskie",
+    "available": "od zaraz",
+    "garage": False,
+    "elevator": True,
+    "basement": True,
+}
+
+
+def _legacy_map(model: Model, feature: str, value: str) -> int:
+    translated_value = translate(feature, value)
+    mapping = model.artifact.cat_features_mapping[feature]
+    for key, val in mapping.items():
+        if val == translated_value:
+            return key
+    raise ValueError(f"Value '{value}' not found in mapping for feature '{feature}'")
+
+
+def legacy_encode(model: Model, data: EstimateInput) -> np.ndarray:
+    """Encoding as it was done before the compiled encoder."""
+    features = validate_schema(model.artifact.booster.feature_names)
+    data_array = np.zeros([len(features)])
+
+    form_data = dict(CONSTANT_INPUTS, build_year=2000)
+    form_data["ad_type"] = _legacy_map(model, "ad_type", data.ad_type)
+    form_data["heating"] = _legacy_map(model, "heating", data.heating)
+    form_data["location_district"] = _legacy_map(
+        model, "location_district", data.district
+    )
+    form_data["market"] = _legacy_map(model, "market", data.market)
+    form_data["ownership"] = _legacy_map(model, "ownership", data.ownership)
+    form_data["state"] = _legacy_map(model, "state", data.state)
+    form_data["area"] = data.area
+    form_data["building_floors"] = data.floorsInBuilding
+    form_data["floor"] = data.floor
+    form_data["rooms"] = data.rooms
+    form_data["utilities_balkon"] = int(data.balcony)
+    form_data["utilities_oddzielna kuchnia"] = int(data.separate_kitchen)
+    form_data["utilities_piwnica"] = int(data.basement)
+    form_data["utilities_pom. użytkowe"] = int(data.basement)
+    form_data["utilities_taras"] = int(data.balcony)
+    form_data["utilities_winda"] = int(data.elevator)
+
+    for i, feature in enumerate(features):
+        data_array[i] = form_data[feature]
+    return np.reshape(data_array, (1, -1))
+
+
+def _time_per_call(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark request encoding.")
+    parser.add_argument(
+        "--bundle", type=str, default="../model/out/krakow_bundle.zip"
+    )
+    parser.add_argument(
+        "--dummy-model",
+        action="store_true",
+        help="use a generated dummy model instead of model/out artifacts",
+    )
+    parser.add_argument("--iterations", type=int, default=20_000)
+    return parser
+
+
+def main():
+    args = create_parser().parse_args()
+    if args.dummy_model:
+        from benchmarks.fixtures import write_dummy_bundle
+
+        with tempfile.TemporaryDirectory() as tmp:
+            args.bundle = os.path.join(tmp, "dummy_bundle.zip")
+            write_dummy_bundle(args.bundle, [SAMPLE_INPUT["district"]])
+            model = Model(args.bundle)
+    else:
+        model = Model(args.bundle)
+    encoder = model.artifact.encoder
+    data = EstimateInput.model_validate(SAMPLE_INPUT)
+
+    legacy = legacy_encode(model, data)
+    compiled = encoder.encode(data)
+    # The legacy encoder has no geocoder nor imputation, compare the other features
+    skipped = [
+        encoder.positions[f]
+        for f in [*GEOCODED_FEATURES, *IMPUTED_INPUTS]
+    ]
+    assert np.array_equal(
+        np.delete(legacy, skipped, axis=1), np.delete(compiled, skipped, axis=1)
+    ), "Encoders disagree"
+
+    before = _time_per_call(lambda: legacy_encode(model, data), args.iterations)
+    after = _time_per_call(lambda: encoder.encode(data), args.iterations)
+
+    print(f"Iterations:         {args.iterations}")
+    print(f"Before (per call):  {before * 1e6:8.2f} us")
+    print(f"After  (per call):  {after * 1e6:8.2f} us")
+    print(f"Speedup:            {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Dummy model bundle, so benchmarks can run without model/out artifacts."""
+
+import hashlib
+import json
+import zipfile
+
+import numpy as np
+
+from model.bundle import BOOSTER_FILE, MANIFEST_FILE
+from model.encoder import CATEGORICAL_INPUTS, EXPECTED_FEATURE_NAMES, TRANSLATIONS
+
+# Same order as in training (columns are sorted by the preprocessing pipeline)
+FEATURES = sorted(EXPECTED_FEATURE_NAMES)
+
+
+def write_dummy_bundle(
+    path: str, districts: list[str], n_trees: int = 200, max_depth: int = 6
+) -> str:
+    """Train a small booster on random data and save it as a model bundle.
+
+    Prediction cost depends on the number and depth of trees, not on what
+    they learned, so this is close enough to the real model for benchmarks.
+    """
+    import xgboost as xgb
+
+    mappings = {
+        feature: sorted(set(TRANSLATIONS[feature].values()))
+        for feature in CATEGORICAL_INPUTS
+        if feature in TRANSLATIONS
+    }
+    mappings["location_district"] = sorted(set(districts))
+
+    rng = np.random.default_rng(42)
+    n = 2000
+    data = rng.uniform(0, 100, size=(n, len(FEATURES)))
+    feature_types = []
+    for i, feature in enumerate(FEATURES):
+        if feature in mappings:
+            data[:, i] = rng.integers(0, len(mappings[feature]), size=n)
+            feature_types.append("c")
+        else:
+            feature_types.append("float")
+    target = data[:, FEATURES.index("area")] * 15_000 + rng.normal(0, 5e4, n)
+
+    dtrain = xgb.DMatrix(
+        data,
+        label=target,
+        feature_names=FEATURES,
+        feature_types=feature_types,
+        enable_categorical=True,
+    )
+    booster = xgb.train(
+        {"max_depth": max_depth, "eta": 0.05, "tree_method": "hist"},
+        dtrain,
+        num_boost_round=n_trees,
+    )
+
+    raw = bytes(booster.save_raw(raw_format="ubj"))
+    digest = hashlib.sha256(raw).hexdigest()
+    manifest = {
+        "format_version": 1,
+        "version": f"dummy-{digest[:8]}",
+        "city": "dummy",
+        "xgboost_version": xgb.__version__,
+        "model_sha256": digest,
+        "features": booster.feature_names,
+        "feature_types": booster.feature_types,
+        "category_mappings": mappings,
+        "preprocessing": {},
+    }
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(MANIFEST_FILE, json.dumps(manifest, ensure_ascii=False))
+        zf.writestr(BOOSTER_FILE, raw)
+    return manifest["version"]
@@ -0,0 +1,205 @@
+"""Load test of the backend, driving the FastAPI app in process.
+
+Payloads are built from scraped listings (model/data/*.csv), requests go
+through an ASGI client (no network), and results are written as JSON so
+runs can be compared.
+
+Run from the backend directory:
+
+    $ python -m benchmarks.load --dummy-model --concurrency 1 8 32
+    $ python -m benchmarks.load --bundle ../model/out/krakow_bundle.zip
+"""
+
+import argparse
+import asyncio
+import csv
+import glob
+import itertools
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from urllib.parse import quote
+
+
+def load_payloads(pattern: str, limit: int) -> list[dict]:
+    from model.listings import listing_to_input
+
+    payloads = []
+    for filename in sorted(glob.glob(pattern)):
+        with open(filename, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    data = listing_to_input(row)
+                except ValueError:
+                    # E.g. no area, which requests can't have either
+                    continue
+                if data.district:
+                    payloads.append(data.model_dump(mode="json"))
+                if len(payloads) >= limit:
+                    return payloads
+    return payloads
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+async def run_scenario(client, requests, concurrency: int) -> dict:
+    """Send `requests` ((method, url, json) tuples) with `concurrency` workers."""
+    queue = iter(requests)
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for method, url, body in queue:
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies, default=0.0) * 1000,
+        },
+    }
+
+
+async def run(args, payloads: list[dict]) -> list[dict]:
+    import httpx
+
+    from main import app
+
+    endpoints = {
+        "/estimate": lambda p: ("POST", "/estimate", p),
+        "/cities/{city_name}": lambda p: ("GET", f"/cities/{quote(p['city'])}", None),
+    }
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as client:
+            for endpoint in args.endpoints:
+                make_request = endpoints[endpoint]
+                for concurrency in args.concurrency:
+                    requests = [
+                        make_request(p)
+                        for p in itertools.islice(
+                            itertools.cycle(payloads), args.requests
+                        )
+                    ]
+                    # Warm-up, not measured
+                    await run_scenario(client, requests[: args.warmup], concurrency)
+                    result = await run_scenario(client, requests, concurrency)
+                    result["endpoint"] = endpoint
+                    results.append(result)
+                    latency = result["latency_ms"]
+                    print(
+                        f"{endpoint:22} c={concurrency:<4} "
+                        f"{result['throughput_rps']:8.1f} req/s  "
+                        f"p50={latency['p50']:6.2f}ms  p95={latency['p95']:6.2f}ms  "
+                        f"p99={latency['p99']:6.2f}ms  errors={result['errors']}"
+                    )
+    return results
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Load test the backend in process.")
+    parser.add_argument(
+        "--data",
+        type=str,
+        default="../model/data/*.csv",
+        help="CSV file(s) with scraped listings (glob pattern)",
+    )
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument(
+        "--endpoints",
+        nargs="+",
+        default=["/estimate", "/cities/{city_name}"],
+        choices=["/estimate", "/cities/{city_name}"],
+    )
+    parser.add_argument(
+        "--bundle", type=str, default=None, help="model bundle to serve"
+    )
+    parser.add_argument(
+        "--dummy-model",
+        action="store_true",
+        help="serve a generated dummy model instead of model/out artifacts",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="disable the prediction cache"
+    )
+    parser.add_argument("--output", type=str, default="benchmark_results.json")
+    return parser
+
+
+def main():
+    args = create_parser().parse_args()
+
+    # The app reads its configuration at import time
+    os.environ["WYCENAPPKA_BLOCKING_LOAD"] = "true"
+    os.environ["WYCENAPPKA_MODEL_WATCH_INTERVAL"] = "0"
+    os.environ.setdefault("WYCENAPPKA_LOG_SAMPLE_RATE", "0")
+    if args.no_cache:
+        os.environ["WYCENAPPKA_CACHE_SIZE"] = "0"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.dummy_model:
+            args.bundle = os.path.join(tmp, "dummy_bundle.zip")
+        # Before anything imports `model`, which creates the models from the
+        # environment (they are loaded later, in the app lifespan)
+        if args.bundle:
+            os.environ["WYCENAPPKA_MODEL_BUNDLE"] = args.bundle
+
+        payloads = load_payloads(args.data, limit=max(args.requests, 1))
+        if not payloads:
+            print(f"No listings found in {args.data}")
+            return
+        print(f"Loaded {len(payloads)} payloads from {args.data}")
+
+        if args.dummy_model:
+            from benchmarks.fixtures import write_dummy_bundle
+
+            write_dummy_bundle(args.bundle, [p["district"] for p in payloads])
+
+        results = asyncio.run(run(args, payloads))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "model": "dummy" if args.dummy_model else args.bundle or "default",
+        "cache": not args.no_cache,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,20 @@
-from fastapi import FastAPI
+import time
+
+_import_start = time.perf_counter()
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import os
 
-from routes import estimate, cities
+from model import model, registry, scheduler, watcher
+from model import ModelNotReadyError, UnknownCityError
+from admission import OverloadedError
+from routes import admin, estimate, cities, health, metrics
+
+_import_time = time.perf_counter() - _import_start
 
 origins = [
     "http://localhost:5173",
@@ -11,19 +22,67 @@ origins = [
 ]
 
 
+async def _load_model_in_background():
+    try:
+        await asyncio.to_thread(model.load)
+    except Exception as e:
+        # Reported by /healthz; the watcher retries once the files change
+        print(f">>> Model loading failed: {str(e)}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print(">>> Starting the app")
-    from model import model
+    print(f">>> Starting the app (imports took {_import_time * 1000:.0f}ms)")
+    app.state.import_time = _import_time
+
+    # By default the model is loaded and warmed up in the background, so the
+    # server starts answering (e.g. /healthz) right away and reports ready
+    # once the model is warm. Set WYCENAPPKA_BLOCKING_LOAD=true to wait instead.
+    if model.ready:
+        # Loaded before forking workers (see prefork.py), only warm it up here
+        await asyncio.to_thread(model.warm_up)
+    elif os.environ.get("WYCENAPPKA_BLOCKING_LOAD", "").lower() == "true":
+        await asyncio.to_thread(model.load)
+    else:
+        app.state.load_task = asyncio.create_task(_load_model_in_background())
 
+    scheduler.start()
+    watcher.start()
     yield
     # any cleanup here
+    await watcher.stop()
+    await scheduler.stop()
     print(">>> Stopping the app")
 
 
 app = FastAPI(title="House Price Estimator", version="0.1.0", lifespan=lifespan)
 app.include_router(estimate.router)
 app.include_router(cities.router)
+app.include_router(admin.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
+
+
+@app.exception_handler(ModelNotReadyError)
+async def model_not_ready_handler(request: Request, exc: ModelNotReadyError):
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(OverloadedError)
+async def overloaded_handler(request: Request, exc: OverloadedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(UnknownCityError)
+async def unknown_city_handler(request: Request, exc: UnknownCityError):
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
+
 
 app.add_middleware(
     CORSMiddleware,
@@ -40,8 +99,26 @@ if __name__ == "__main__":
     # Check if the WYCENAPPKA_PROD environment variable is set to true
     is_prod = os.environ.get("WYCENAPPKA_PROD", "").lower() == "true"
 
+    workers = int(os.environ.get("WYCENAPPKA_WORKERS", "1"))
+
     # Set production mode settings if needed
-    if is_prod:
+    if is_prod and workers > 1:
+        import prefork
+
+        # Split CPU cores between workers unless set explicitly
+        if model.nthread is None:
+            model.nthread = max(1, (os.cpu_count() or 1) // workers)
+            registry.model_options["nthread"] = model.nthread
+        print(f"Running in production mode with {workers} workers")
+        prefork.serve(
+            app,
+            host="0.0.0.0",
+            port=8001,
+            workers=workers,
+            # Booster must not run before fork - OpenMP isn't fork-safe
+            preload=lambda: model.load(warm_up=False),
+        )
+    elif is_prod:
         print("Running in production mode")
         uvicorn.run(app="main:app", host="0.0.0.0", port=8001, log_level="info")
     else:
@@ -0,0 +1,332 @@
+"""Minimal Prometheus-style metrics (text exposition format 0.0.4).
+
+Metrics live in the worker process, so with several workers each scrape
+sees the numbers of the worker that answered it.
+"""
+
+import bisect
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], **extra) -> str:
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ] + self._samples()
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {value}"
+            for key, value in values.items()
+        ]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {value}"
+            for key, value in values.items()
+        ]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # {labels: [bucket counts..., +Inf count, sum]}
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            data[i] += 1
+            data[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = {key: list(data) for key, data in self._values.items()}
+        lines = []
+        for key, data in values.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), data[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labels, key, le=le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {data[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(
+    Counter(
+        "wycenappka_requests_total",
+        "HTTP requests handled.",
+        ("route", "method", "status"),
+    )
+)
+ERRORS = REGISTRY.register(
+    Counter(
+        "wycenappka_errors_total",
+        "Requests that failed with an exception.",
+        ("route", "type"),
+    )
+)
+MAPPING_ERRORS = REGISTRY.register(
+    Counter(
+        "wycenappka_mapping_errors_total",
+        "Input values not found in the model category mappings.",
+        ("feature",),
+    )
+)
+STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "wycenappka_stage_duration_seconds",
+        "Time spent in each stage of request handling.",
+        ("route", "stage"),
+    )
+)
+PREDICT_SECONDS = REGISTRY.register(
+    Histogram(
+        "wycenappka_predict_duration_seconds",
+        "Time spent in a single XGBoost predict call.",
+    )
+)
+PREDICT_ROWS = REGISTRY.register(
+    Histogram(
+        "wycenappka_predict_rows",
+        "Rows passed to a single XGBoost predict call.",
+        buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096),
+    )
+)
+CACHE_HITS = REGISTRY.register(
+    Gauge("wycenappka_cache_hits", "Prediction cache hits since model load.")
+)
+CACHE_MISSES = REGISTRY.register(
+    Gauge("wycenappka_cache_misses", "Prediction cache misses since model load.")
+)
+CACHE_SIZE = REGISTRY.register(
+    Gauge("wycenappka_cache_size", "Predictions currently cached.")
+)
+ADMISSION_REJECTED = REGISTRY.register(
+    Counter(
+        "wycenappka_admission_rejected_total",
+        "Requests shed by admission control (503).",
+        ("route", "reason"),
+    )
+)
+ADMISSION_IN_FLIGHT = REGISTRY.register(
+    Gauge("wycenappka_admission_in_flight", "Admission slots in use.")
+)
+ADMISSION_QUEUE = REGISTRY.register(
+    Gauge("wycenappka_admission_queue_depth", "Estimate requests waiting for a slot.")
+)
+ADMISSION_WAIT_SECONDS = REGISTRY.register(
+    Histogram(
+        "wycenappka_admission_wait_seconds",
+        "Time admitted requests waited for a slot.",
+        ("route",),
+    )
+)
+SCHEDULER_QUEUE = REGISTRY.register(
+    Gauge("wycenappka_scheduler_queue_depth", "Rows waiting for the next predict batch.")
+)
+
+
+# Per-request timestamps shared between TimedRoute and the wrapped endpoint
+_marks: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    "_marks", default=None
+)
+
+
+def add_mark(name: str, seconds: float) -> None:
+    """Record time spent in the current request, e.g. waiting for admission."""
+    marks = _marks.get()
+    if marks is not None:
+        marks[name] = marks.get(name, 0.0) + seconds
+
+
+def _mark_endpoint(endpoint):
+    if not inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        marks = _marks.get()
+        if marks is not None:
+            marks["endpoint_start"] = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if marks is not None:
+                marks["endpoint_end"] = time.perf_counter()
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """Route that records request counts, errors and stage timings.
+
+    Time before the endpoint runs is body parsing and validation (without
+    the wait for admission, see wycenappka_admission_wait_seconds), time
+    after it returns is response validation and serialization.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _mark_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        route = self.path
+
+        async def timed_handler(request):
+            marks = {}
+            token = _marks.set(marks)
+            start = time.perf_counter()
+            status = 500
+            try:
+                response = await handler(request)
+                status = response.status_code
+                return response
+            except RequestValidationError:
+                status = 422
+                raise
+            except Exception as e:
+                status = getattr(e, "status_code", 500)
+                if status >= 500:
+                    ERRORS.inc(route=route, type=type(e).__name__)
+                raise
+            finally:
+                end = time.perf_counter()
+                _marks.reset(token)
+                REQUESTS.inc(route=route, method=request.method, status=status)
+                if "endpoint_start" in marks:
+                    validation = marks["endpoint_start"] - start
+                    validation -= marks.get("admission_wait", 0.0)
+                    STAGE_SECONDS.observe(validation, route=route, stage="validation")
+                if "endpoint_end" in marks:
+                    STAGE_SECONDS.observe(
+                        end - marks["endpoint_end"], route=route, stage="serialization"
+                    )
+
+        return timed_handler
@@ -1,164 +1,288 @@
-import pickle
+import importlib
+import os
+import threading
+import time
 import numpy as np
-from xgboost import XGBRegressor
 
+from metrics import PREDICT_ROWS, PREDICT_SECONDS
 from schemas.estimate import EstimateInput
+from .artifact import ModelArtifact, load_artifact
+from .cache import PredictionCache
+from .grid import predict_grid
+from .registry import ModelRegistry, UnknownCityError
+from .scheduler import DeadlineExceededError, InferenceScheduler
+from .watcher import ModelWatcher
 
-__all__ = ["model"]
+__all__ = [
+    "model",
+    "registry",
+    "scheduler",
+    "watcher",
+    "DeadlineExceededError",
+    "ModelNotReadyError",
+    "UnknownCityError",
+]
+
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when a prediction is requested before the model is loaded."""
+
+    status_code = 503
 
 
 class Model:
-    _model: XGBRegressor | None = None
-    _cat_features_mapping: dict[str, dict[int, str]] = {}
+    """Serves predictions from the currently loaded model artifact.
+
+    The artifact is replaced as a whole on reload, so callers that need
+    several operations to agree (encode, then predict) should take
+    `model.artifact` once and pass it along.
+    """
+
+    _artifact: ModelArtifact | None = None
 
-    def __init__(self, model_path=None, cat_file_path=None):
-        self._load_model(model_path, cat_file_path)
+    def __init__(
+        self,
+        bundle_path=None,
+        cache_size=1024,
+        cache_ttl=0.0,
+        nthread=None,
+        lazy=False,
+    ):
+        self.bundle_path = bundle_path
+        self.nthread = nthread
+        self.load_timings: dict[str, float] = {}
+        self.load_error: str | None = None
+        self._cache = PredictionCache(maxsize=cache_size, ttl=cache_ttl)
+        self._explanations = PredictionCache(maxsize=cache_size, ttl=cache_ttl)
+        # Grids are large, keep only a few
+        self._grids = PredictionCache(maxsize=min(cache_size, 32), ttl=cache_ttl)
+        self._reload_lock = threading.Lock()
+        if not lazy:
+            self._load_model(bundle_path)
 
-    def _load_model(self, model_path, cat_file_path):
+    def _load_model(self, bundle_path, warm_up=True):
         """Load model from file."""
-        with open(model_path, "rb") as file:
-            # Load the model using pickle
-            self._model = pickle.load(file)
-        with open(cat_file_path, "rb") as file:
-            self._cat_features_mapping = pickle.load(file)
-        print(">>> Model loaded successfully.")
-
-    def predict(self, data: EstimateInput):
-        """Make prediction using the loaded model."""
-        data = self.convert_to_xgboost_input(data)
-        print(">>> Raw data for prediction:", data)
-        return self._model.predict(data)
+        timings = {}
+        start = time.perf_counter()
+        importlib.import_module("xgboost")
+        timings["import"] = time.perf_counter() - start
 
-    def get_districts(self) -> list[str]:
-        return [v for v in self._cat_features_mapping["location_district"].values()]
-
-    def convert_to_xgboost_input(self, data: EstimateInput) -> np.array:
-        features = validate_schema(self._model)
-        n_features = len(features)
-        data_array = np.zeros([n_features])
-
-        form_data = {}
-        # Categorical features
-        form_data["ad_type"] = self._map("ad_type", data.ad_type)
-        form_data["heating"] = self._map("heating", data.heating)
-        form_data["location_district"] = self._map("location_district", data.district)
-        form_data["market"] = self._map("market", data.market)
-        form_data["ownership"] = self._map("ownership", data.ownership)
-        form_data["state"] = self._map("state", data.state)
-
-        # Numerical features - todo
-        form_data["area"] = data.area
-        form_data["build_year"] = 2000  # TODO: missing in backend
-        form_data["building_floors"] = data.floorsInBuilding
-        form_data["floor"] = data.floor
-        form_data["location_lat"] = 50.0647  # TODO: missing calculation from address
-        form_data["location_lon"] = 19.9450  # TODO: missing calculation from address
-        form_data["rooms"] = data.rooms
-        form_data["utilities_balkon"] = int(data.balcony)
-        form_data["utilities_oddzielna kuchnia"] = int(data.separate_kitchen)
-        form_data["utilities_piwnica"] = int(data.basement)
-        form_data["utilities_pom. użytkowe"] = int(data.basement)
-        form_data["utilities_taras"] = int(data.balcony)
-        form_data["utilities_winda"] = int(data.elevator)
-        # form_data["utilities_garage"] = int(data.garage) # TODO: add in model or remove from frontend
-        # TODO: available in frontend but not used: available from
-        form_data["distance_from_center"] = (
-            0.0  # TODO: missing calculation from address
+        start = time.perf_counter()
+        artifact = load_artifact(bundle_path, nthread=self.nthread)
+        timings["load"] = time.perf_counter() - start
+
+        if warm_up:
+            start = time.perf_counter()
+            artifact.warm_up()
+            timings["warm_up"] = time.perf_counter() - start
+
+        # Single reference assignment - requests see either old or new artifact
+        self._artifact = artifact
+        self.bundle_path = bundle_path
+        self.load_timings = timings
+        self.load_error = None
+        # Cached predictions belong to the previous artifact
+        self.clear_cache()
+        print(
+            f">>> Model {artifact.version} loaded successfully "
+            + ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in timings.items())
         )
 
-        # Fill data_array with values from form_data using fetures array
-        for i, feature in enumerate(features):
-            if feature in form_data:
-                data_array[i] = form_data[feature]
+    def reload(self, bundle_path=None) -> str:
+        """Load a new artifact and swap it in. Returns the new version."""
+        with self._reload_lock:
+            self._load_model(bundle_path or self.bundle_path)
+            return self.artifact.version
+
+    def load(self, warm_up=True) -> None:
+        """Load the model if it hasn't been loaded yet (e.g. when lazy)."""
+        with self._reload_lock:
+            if self._artifact is not None:
+                return
+            try:
+                self._load_model(self.bundle_path, warm_up=warm_up)
+            except Exception as e:
+                self.load_error = str(e)
+                raise
+
+    def warm_up(self) -> None:
+        """Run a dummy prediction, e.g. in a worker forked after `load`."""
+        start = time.perf_counter()
+        self.artifact.warm_up()
+        self.load_timings["warm_up"] = time.perf_counter() - start
+
+    @property
+    def ready(self) -> bool:
+        return self._artifact is not None
+
+    @property
+    def artifact(self) -> ModelArtifact:
+        artifact = self._artifact
+        if artifact is None:
+            raise ModelNotReadyError("Model is not loaded yet")
+        return artifact
+
+    @property
+    def version(self) -> str:
+        return self.artifact.version
+
+    def predict_encoded(
+        self, data_array: np.ndarray, artifact: ModelArtifact
+    ) -> np.ndarray:
+        """Predict rows, calling XGBoost only for rows missing from the cache."""
+        prices = np.empty([len(data_array)], dtype=np.float32)
+        missing = []
+        for i, row in enumerate(data_array):
+            price = self.cached_prediction(row, artifact)
+            if price is None:
+                missing.append(i)
             else:
-                raise ValueError(f"Feature '{feature}' not found in form_data")
-
-        # Reshape the 1D array to a 2D array (1 x 38) as required by XGBoost
-        data_array = np.reshape(data_array, (1, -1))
-        return data_array
-
-    def _map(self, feature: str, value: str) -> int:
-        translated_value = translate(feature, value)
-        if feature in self._cat_features_mapping:
-            mapping = self._cat_features_mapping[feature]
-            for key, val in mapping.items():
-                if val == translated_value:
-                    return key
-        raise ValueError(
-            f"Value '{value}' not found in mapping for feature '{feature}'"
-        )
+                prices[i] = price
+
+        if missing:
+            prices[missing] = self.predict_rows(data_array[missing], artifact)
+        return prices
+
+    def cached_prediction(self, row: np.ndarray, artifact=None) -> float | None:
+        """Prediction for an encoded row if it is in the cache."""
+        artifact = artifact or self.artifact
+        return self._cache.get(self._cache.key(row, artifact.version))
+
+    def predict_rows(self, data_array: np.ndarray, artifact=None) -> np.ndarray:
+        """Run the booster on encoded rows and remember the results."""
+        artifact = artifact or self.artifact
+        start = time.perf_counter()
+        prices = artifact.predict(data_array)
+        PREDICT_SECONDS.observe(time.perf_counter() - start)
+        PREDICT_ROWS.observe(len(data_array))
+        for row, price in zip(data_array, prices):
+            self._cache.put(self._cache.key(row, artifact.version), float(price))
+        return prices
 
+    def explain_rows(
+        self, data_array: np.ndarray, artifact=None, exact: bool = False
+    ) -> np.ndarray:
+        """Contributions of encoded rows (see ModelArtifact.explain), cached."""
+        artifact = artifact or self.artifact
+        # Exact and approximate contributions are cached separately
+        version = f"{artifact.version}:{'exact' if exact else 'approx'}"
+        contribs = np.empty([len(data_array), artifact.encoder.n_features + 1])
+        missing = []
+        for i, row in enumerate(data_array):
+            cached = self._explanations.get(self._explanations.key(row, version))
+            if cached is None:
+                missing.append(i)
+            else:
+                contribs[i] = cached
+
+        if missing:
+            start = time.perf_counter()
+            computed = artifact.explain(data_array[missing], exact=exact)
+            PREDICT_SECONDS.observe(time.perf_counter() - start)
+            PREDICT_ROWS.observe(len(missing))
+            for i, row_contribs in zip(missing, computed):
+                contribs[i] = row_contribs
+                key = self._explanations.key(data_array[i], version)
+                self._explanations.put(key, contribs[i].copy())
+        return contribs
+
+    def explain(self, data: EstimateInput, artifact=None, exact: bool = False) -> dict:
+        """Price of an input with the contribution of every feature to it.
+
+        Categorical values are reported as category names instead of codes,
+        contributions are sorted by their absolute value.
+        """
+        artifact = artifact or self.artifact
+        row = artifact.encoder.encode(data)
+        contribs = self.explain_rows(row, artifact, exact)[0]
+
+        mapping = artifact.cat_features_mapping
+        contributions = []
+        for feature, value, contribution in zip(
+            artifact.encoder.features, row[0], contribs[:-1]
+        ):
+            if feature in mapping:
+                value = mapping[feature].get(int(value), value)
+            contributions.append(
+                {"feature": feature, "value": value, "contribution": float(contribution)}
+            )
+        contributions.sort(key=lambda c: abs(c["contribution"]), reverse=True)
+        return {
+            "price": float(contribs.sum()),
+            "base_value": float(contribs[-1]),
+            "contributions": contributions,
+        }
+
+    def predict_grid(
+        self,
+        data: EstimateInput,
+        bbox: tuple[float, float, float, float],
+        width: int,
+        height: int,
+        artifact=None,
+        deadline: float | None = None,
+    ) -> np.ndarray:
+        """Price per m² of a flat over a lat/lon grid (see grid.py), cached."""
+        artifact = artifact or self.artifact
+        row = artifact.encoder.encode(data)[0]
+        # The encoded row doesn't include what the grid changes, so add it
+        key = self._grids.key(row, f"{artifact.version}:{bbox}:{width}x{height}")
+        grid = self._grids.get(key)
+        if grid is None:
+            start = time.perf_counter()
+            grid = predict_grid(artifact, data, bbox, width, height, deadline)
+            PREDICT_SECONDS.observe(time.perf_counter() - start)
+            PREDICT_ROWS.observe(width * height)
+            self._grids.put(key, grid)
+        return grid
+
+    def cache_stats(self) -> dict[str, int | float]:
+        return self._cache.stats()
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+        self._explanations.clear()
+        self._grids.clear()
+
+    @property
+    def memory_estimate(self) -> int:
+        """Approximate memory of the loaded booster (0 if not loaded)."""
+        artifact = self._artifact
+        return artifact.memory_estimate if artifact is not None else 0
 
-model = Model(
-    "../model/out/krakow_model.pkl", "../model/out/category_mappings_krakow.pkl"
+    def get_districts(self) -> list[str]:
+        return self.artifact.districts
+
+
+def _predict_rows(data_array: np.ndarray, context) -> np.ndarray:
+    """Scheduler callback, context is the (model, artifact) rows belong to."""
+    city_model, artifact = context
+    return city_model.predict_rows(data_array, artifact)
+
+
+# Models are created lazy and loaded in lifespan (default city) or on first
+# request (other cities), so importing the app stays cheap
+registry = ModelRegistry(
+    Model,
+    bundle_dir=os.environ.get("WYCENAPPKA_MODEL_DIR", "../model/out"),
+    default_city=os.environ.get("WYCENAPPKA_DEFAULT_CITY", "krakow"),
+    default_bundle=os.environ.get("WYCENAPPKA_MODEL_BUNDLE"),
+    memory_budget=int(os.environ.get("WYCENAPPKA_MODEL_MEMORY_MB", "1024")) << 20,
+    cache_size=int(os.environ.get("WYCENAPPKA_CACHE_SIZE", "1024")),
+    cache_ttl=float(os.environ.get("WYCENAPPKA_CACHE_TTL", "0")),
+    nthread=int(os.environ.get("WYCENAPPKA_XGB_NTHREAD", "0")) or None,
 )
 
+# Model of the default city
+model = registry.default
 
-def validate_schema(model: XGBRegressor) -> int:
-    """ " Validate schema of the model. Version 2.1.0"""
-    features = model.get_booster().feature_names
-    expected_feature_names = [
-        "ad_type",
-        "area",
-        "build_year",
-        "building_floors",
-        "floor",
-        "heating",
-        "location_district",
-        "location_lat",
-        "location_lon",
-        "market",
-        "ownership",
-        "rooms",
-        "state",
-        "utilities_balkon",
-        "utilities_oddzielna kuchnia",
-        "utilities_piwnica",
-        "utilities_pom. użytkowe",
-        "utilities_taras",
-        "utilities_winda",
-        "distance_from_center",
-    ]
-
-    # Check if all expected features are present regardless of order
-    for feature in expected_feature_names:
-        assert feature in features, f"Expected feature '{feature}' is missing"
-
-    assert len(features) == len(
-        expected_feature_names
-    ), f"Expected {len(expected_feature_names)} features, got {len(features)}"
-
-    return features
-
-
-def translate(feature: str, value: str) -> str:
-    """Translate feature value to its original value."""
-    if feature == "location_district":
-        return value
-
-    dictionary = {
-        "ad_type": {"prywatny": "private", "biuro": "business"},
-        "heating": {
-            "miejskie": "boiler_room",
-            "gazowe": "gas",
-            "elektryczne": "electric",
-            "inne": "other",
-        },  # TODO: inne są w modelu
-        "market": {"Pierwotny": "primary", "Wtórny": "secondary"},
-        "ownership": {
-            "Własnościowe": "full_ownership",
-            "Spoldzielcze": "usufruct",
-            "Inne": "share",
-        },  # TODO: inne są w modelu
-        "state": {
-            "Do zamieszkania": "ready_to_use",
-            "Do remontu": "to_renovation",
-            "Do wykończenia": "to_completion",
-        },
-    }
-    res: str | None = dictionary.get(feature, {}).get(value, value)
-    if res is None:
-        raise ValueError(
-            f"Value '{value}' not found in dictionary for feature '{feature}'"
-        )
-    return res
+scheduler = InferenceScheduler(
+    _predict_rows,
+    max_batch_size=int(os.environ.get("WYCENAPPKA_MAX_BATCH_SIZE", "64")),
+    max_delay=float(os.environ.get("WYCENAPPKA_MAX_BATCH_DELAY_MS", "2")) / 1000,
+)
+
+watcher = ModelWatcher(
+    registry.loaded,
+    interval=float(os.environ.get("WYCENAPPKA_MODEL_WATCH_INTERVAL", "30")),
+)
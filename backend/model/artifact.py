@@ -0,0 +1,110 @@
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .bundle import booster_size, category_mappings, read_bundle, read_comparables
+from .comparables import ComparablesIndex
+from .encoder import FeatureEncoder, validate_schema
+from .geocoder import Geocoder
+from .imputer import DistrictImputer
+from .stats import district_stats
+
+if TYPE_CHECKING:
+    from xgboost import Booster
+
+# In-memory booster vs. its UBJ size, measured on the Kraków model
+BOOSTER_MEMORY_FACTOR = 4.3
+
+
+@dataclass(frozen=True, eq=False)
+class ModelArtifact:
+    """Everything needed to serve one trained model.
+
+    Instances are never mutated, so a request that picked up an artifact
+    keeps a consistent booster/mapping/encoder set even if a newer one is
+    swapped in while it is being served.
+    """
+
+    booster: "Booster"
+    cat_features_mapping: dict[str, dict[int, str]]
+    encoder: FeatureEncoder
+    version: str
+    manifest: dict = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.time)
+    size_bytes: int = 0
+    comparables: ComparablesIndex | None = None
+    # Computed once at load, served as is by /cities
+    districts: list[str] = field(default_factory=list)
+    district_stats: dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def preprocessing(self) -> dict:
+        """Config written by preprocess_data during training."""
+        return self.manifest.get("preprocessing", {})
+
+    @property
+    def memory_estimate(self) -> int:
+        """Approximate memory taken by the loaded booster and comparables, in bytes."""
+        comparables = self.comparables.nbytes if self.comparables else 0
+        return int(self.size_bytes * BOOSTER_MEMORY_FACTOR) + comparables
+
+    def predict(self, data_array: np.ndarray) -> np.ndarray:
+        return self.booster.inplace_predict(data_array)
+
+    def explain(self, data_array: np.ndarray, exact: bool = False) -> np.ndarray:
+        """Per-feature contributions of rows, bias in the last column.
+
+        A row sums up to its prediction, so price and explanation come from
+        the same booster call. Exact SHAP values cost several times more
+        than a prediction, the approximation (Saabas) about twice as much.
+        """
+        from xgboost import DMatrix
+
+        dmatrix = DMatrix(
+            data_array,
+            feature_names=self.booster.feature_names,
+            feature_types=self.booster.feature_types,
+            enable_categorical=True,
+        )
+        return self.booster.predict(
+            dmatrix, pred_contribs=True, approx_contribs=not exact
+        )
+
+    def warm_up(self) -> None:
+        """Run a dummy prediction so the first request doesn't pay for it."""
+        self.predict(np.zeros([1, self.encoder.n_features]))
+
+
+def load_artifact(bundle_path: str, nthread: int | None = None) -> ModelArtifact:
+    """Load model bundle written by model/src/train_model.py.
+
+    Loading the booster imports xgboost, which takes most of the startup
+    time, so nothing imports it at module level.
+    """
+    booster, manifest = read_bundle(bundle_path)
+    if nthread:
+        booster.set_param({"nthread": nthread})
+    mapping = category_mappings(manifest)
+    preprocessing = manifest.get("preprocessing", {})
+    comparables = read_comparables(bundle_path)
+    comparables = ComparablesIndex.from_bytes(comparables) if comparables else None
+    features = validate_schema(booster.feature_names)
+    districts = list(mapping["location_district"].values())
+    return ModelArtifact(
+        booster=booster,
+        cat_features_mapping=mapping,
+        encoder=FeatureEncoder(
+            features,
+            mapping,
+            geocoder=Geocoder.from_preprocessing(preprocessing),
+            imputer=DistrictImputer.from_preprocessing(preprocessing),
+        ),
+        version=manifest["version"],
+        manifest=manifest,
+        size_bytes=booster_size(bundle_path),
+        comparables=comparables,
+        districts=districts,
+        district_stats=district_stats(districts, comparables, preprocessing),
+    )
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import zipfile
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from xgboost import Booster
+
+# Keep in sync with model/src/bundle.py
+SUPPORTED_FORMAT_VERSIONS = {1}
+MANIFEST_FILE = "manifest.json"
+BOOSTER_FILE = "model.ubj"
+COMPARABLES_FILE = "comparables.npz"
+
+
+class BundleError(ValueError):
+    """Model bundle is malformed or its parts don't match each other."""
+
+
+def read_bundle(path: str) -> tuple["Booster", dict]:
+    """Load booster and manifest from a model bundle, checking consistency."""
+    from xgboost import Booster
+
+    try:
+        with zipfile.ZipFile(path) as zf:
+            manifest = json.loads(zf.read(MANIFEST_FILE))
+            raw = zf.read(BOOSTER_FILE)
+    except (KeyError, zipfile.BadZipFile, json.JSONDecodeError) as e:
+        raise BundleError(f"Cannot read model bundle '{path}': {str(e)}") from e
+
+    if manifest.get("format_version") not in SUPPORTED_FORMAT_VERSIONS:
+        raise BundleError(
+            f"Unsupported bundle format version {manifest.get('format_version')}"
+        )
+    if hashlib.sha256(raw).hexdigest() != manifest.get("model_sha256"):
+        raise BundleError("Booster checksum doesn't match the manifest")
+
+    booster = Booster()
+    booster.load_model(bytearray(raw))
+
+    features = manifest["features"]
+    if booster.feature_names != features:
+        raise BundleError("Booster features don't match the feature manifest")
+    if booster.feature_types != manifest["feature_types"]:
+        raise BundleError("Booster feature types don't match the feature manifest")
+
+    mappings = manifest["category_mappings"]
+    for feature, feature_type in zip(features, booster.feature_types):
+        if (feature_type == "c") != (feature in mappings):
+            raise BundleError(f"Category mapping mismatch for feature '{feature}'")
+
+    return booster, manifest
+
+
+def booster_size(path: str) -> int:
+    """Size of the serialized booster in a bundle (uncompressed), in bytes."""
+    with zipfile.ZipFile(path) as zf:
+        return zf.getinfo(BOOSTER_FILE).file_size
+
+
+def read_comparables(path: str) -> bytes | None:
+    """Comparables data of a bundle, None for bundles built without it."""
+    with zipfile.ZipFile(path) as zf:
+        if COMPARABLES_FILE not in zf.namelist():
+            return None
+        return zf.read(COMPARABLES_FILE)
+
+
+def category_mappings(manifest: dict) -> dict[str, dict[int, str]]:
+    """Category mappings in the {feature: {code: value}} form used in training."""
+    return {
+        feature: dict(enumerate(values))
+        for feature, values in manifest["category_mappings"].items()
+    }
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+
+
+class PredictionCache:
+    """Bounded, thread-safe LRU cache of predictions keyed by encoded rows.
+
+    Values are usually prices, but anything computed from a row (e.g. an
+    explanation) can be cached the same way.
+
+    Entries older than `ttl` seconds are treated as misses. A `ttl` of 0
+    disables expiry and a `maxsize` of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[bytes, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(row: np.ndarray, version: str = "") -> bytes:
+        """Canonical key of an encoded feature row for a given model version."""
+        row = np.ascontiguousarray(row, dtype=np.float64)
+        return version.encode() + b":" + row.tobytes()
+
+    def get(self, key: bytes) -> Any | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if not self.ttl or time.monotonic() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: bytes, value: Any) -> None:
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
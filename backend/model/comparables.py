@@ -0,0 +1,62 @@
+import io
+
+import numpy as np
+
+# Keep in sync with model/src/comparables.py
+FEATURES = ["location_lat", "location_lon", "area", "rooms", "floor"]
+
+
+class ComparablesIndex:
+    """Nearest-neighbour search over the listings the model was trained on.
+
+    Listings come already scaled from the bundle (see build_comparables),
+    here they are only put in a k-d tree, so a query is O(log n) instead of
+    a scan over all listings.
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        from scipy.spatial import cKDTree
+
+        # Also used for district statistics, see stats.py
+        self.arrays = arrays
+        self._mean = arrays["mean"]
+        self._scale = arrays["scale"]
+        self._km_per_degree = arrays["km_per_degree"]
+        self._tree = cKDTree(arrays["points"])
+        self.size = len(arrays["points"])
+        # The tree holds about another copy of the points
+        self.nbytes = sum(a.nbytes for a in arrays.values()) + arrays["points"].nbytes
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ComparablesIndex":
+        with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+            return cls({name: npz[name] for name in npz.files})
+
+    def _point(self, features: np.ndarray) -> np.ndarray:
+        point = np.array(features, dtype=np.float64)
+        point[:2] *= self._km_per_degree
+        return (point - self._mean) / self._scale
+
+    def query(self, features: np.ndarray, n: int = 10) -> list[dict]:
+        """Listings most similar to `features` (values of FEATURES), closest first."""
+        n = min(n, self.size)
+        if n <= 0:
+            return []
+        distances, indices = self._tree.query(self._point(features), k=n)
+        distances, indices = np.atleast_1d(distances), np.atleast_1d(indices)
+
+        a = self.arrays
+        return [
+            {
+                "price": float(a["price"][i]),
+                "price_m2": float(a["price"][i] / a["area"][i]),
+                "area": float(a["area"][i]),
+                "rooms": int(a["rooms"][i]),
+                "floor": int(a["floor"][i]),
+                "district": str(a["district"][i]),
+                "location_lat": float(a["location_lat"][i]),
+                "location_lon": float(a["location_lon"][i]),
+                "distance": float(distance),
+            }
+            for distance, i in zip(distances, indices)
+        ]
@@ -0,0 +1,358 @@
+from operator import attrgetter
+from typing import Callable
+
+import numpy as np
+
+from schemas.estimate import EstimateInput
+
+EXPECTED_FEATURE_NAMES = [
+    "ad_type",
+    "area",
+    "build_year",
+    "building_floors",
+    "floor",
+    "heating",
+    "location_district",
+    "location_lat",
+    "location_lon",
+    "market",
+    "ownership",
+    "rooms",
+    "state",
+    "utilities_balkon",
+    "utilities_oddzielna kuchnia",
+    "utilities_piwnica",
+    "utilities_pom. użytkowe",
+    "utilities_taras",
+    "utilities_winda",
+    "distance_from_center",
+]
+
+# Form values (as sent by the frontend) -> values the model was trained on
+TRANSLATIONS = {
+    "ad_type": {"prywatny": "private", "biuro": "business"},
+    "heating": {
+        "miejskie": "boiler_room",
+        "gazowe": "gas",
+        "elektryczne": "electric",
+        "inne": "other",
+    },  # TODO: inne są w modelu
+    "market": {"Pierwotny": "primary", "Wtórny": "secondary"},
+    "ownership": {
+        "Własnościowe": "full_ownership",
+        "Spoldzielcze": "usufruct",
+        "Inne": "share",
+    },  # TODO: inne są w modelu
+    "state": {
+        "Do zamieszkania": "ready_to_use",
+        "Do remontu": "to_renovation",
+        "Do wykończenia": "to_completion",
+    },
+}
+
+# Categorical model feature -> EstimateInput attribute
+CATEGORICAL_INPUTS = {
+    "ad_type": "ad_type",
+    "heating": "heating",
+    "location_district": "district",
+    "market": "market",
+    "ownership": "ownership",
+    "state": "state",
+}
+
+# Numerical model feature -> EstimateInput attribute
+NUMERICAL_INPUTS = {
+    "area": "area",
+    "floor": "floor",
+    "rooms": "rooms",
+    "utilities_balkon": "balcony",
+    "utilities_oddzielna kuchnia": "separate_kitchen",
+    "utilities_piwnica": "basement",
+    "utilities_pom. użytkowe": "basement",
+    "utilities_taras": "balcony",
+    "utilities_winda": "elevator",
+    # "utilities_garage": "garage", # TODO: add in model or remove from frontend
+    # TODO: available in frontend but not used: available from
+}
+
+# Optional numerical model feature -> EstimateInput attribute. Missing values
+# are filled with the district median from training (see imputer.py)
+IMPUTED_INPUTS = {
+    "build_year": "build_year",
+    "building_floors": "floorsInBuilding",
+}
+
+# Values outside these ranges are treated as missing (as in _clear_wrong_build_year)
+VALID_RANGES = {
+    "build_year": (1000, 2030),
+}
+
+# Used when the model has no district medians; NaN is "missing" for XGBoost
+IMPUTE_DEFAULTS = {
+    "build_year": 2000,
+    "building_floors": np.nan,
+}
+
+# Features that are not provided by the form yet
+CONSTANT_INPUTS = {
+    # Used when the model has no geocoder (see geocoder.py)
+    "location_lat": 50.0647,
+    "location_lon": 19.9450,
+    "distance_from_center": 0.0,
+}
+
+# Features filled by the geocoder, in the order returned by Geocoder.locate
+GEOCODED_FEATURES = ["location_lat", "location_lon", "distance_from_center"]
+
+
+def _in_range(values, low: float, high: float):
+    """Whether values of an imputed feature are used as they are.
+
+    NaN (missing) is never in range. Works on numbers and on numpy arrays,
+    so single inputs and whole columns follow the same rule.
+    """
+    return (values >= low) & (values <= high)
+
+
+class MappingError(ValueError):
+    """Input value not found in the category mapping of a feature."""
+
+    def __init__(self, feature: str, value):
+        super().__init__(
+            f"Value '{value}' not found in mapping for feature '{feature}'"
+        )
+        self.feature = feature
+        self.value = value
+
+
+def validate_schema(features: list[str]) -> list[str]:
+    """ " Validate schema of the model. Version 2.1.0"""
+    # Check if all expected features are present regardless of order
+    for feature in EXPECTED_FEATURE_NAMES:
+        assert feature in features, f"Expected feature '{feature}' is missing"
+
+    assert len(features) == len(
+        EXPECTED_FEATURE_NAMES
+    ), f"Expected {len(EXPECTED_FEATURE_NAMES)} features, got {len(features)}"
+
+    return features
+
+
+def translate(feature: str, value: str) -> str:
+    """Translate feature value to its original value."""
+    if feature == "location_district":
+        return value
+
+    res: str | None = TRANSLATIONS.get(feature, {}).get(value, value)
+    if res is None:
+        raise ValueError(
+            f"Value '{value}' not found in dictionary for feature '{feature}'"
+        )
+    return res
+
+
+class FeatureEncoder:
+    """Turns EstimateInput objects into model rows.
+
+    Everything that depends only on the model (feature positions, reverse
+    category lookups, the constant part of a row) is computed once in
+    __init__, so encoding a request is a single pass over the features.
+    """
+
+    def __init__(
+        self,
+        features: list[str],
+        cat_features_mapping: dict[str, dict[int, str]],
+        geocoder=None,
+        imputer=None,
+    ):
+        self.features = list(features)
+        self.n_features = len(self.features)
+        self.positions = {feature: i for i, feature in enumerate(self.features)}
+
+        # {feature: {form value: category code}}
+        self._codes: dict[str, dict[str, int]] = {}
+        for feature in CATEGORICAL_INPUTS:
+            mapping = cat_features_mapping.get(feature, {})
+            reverse = {val: key for key, val in mapping.items()}
+            codes = dict(reverse)
+            for form_value, model_value in TRANSLATIONS.get(feature, {}).items():
+                if model_value in reverse:
+                    codes[form_value] = reverse[model_value]
+            self._codes[feature] = codes
+
+        self._template = np.zeros([self.n_features])
+        for feature, value in CONSTANT_INPUTS.items():
+            self._template[self._position(feature)] = value
+
+        self._setters: list[tuple[int, Callable[[EstimateInput], float]]] = []
+        for feature, attr in CATEGORICAL_INPUTS.items():
+            self._setters.append(
+                (self._position(feature), self._category_getter(feature, attr))
+            )
+        for feature, attr in NUMERICAL_INPUTS.items():
+            self._setters.append((self._position(feature), attrgetter(attr)))
+
+        self.geocoder = geocoder
+        self._geocoded = [self._position(feature) for feature in GEOCODED_FEATURES]
+
+        # Medians indexed by the district code written into the row
+        district_codes = self._codes["location_district"]
+        if imputer is not None:
+            tables = imputer.tables(district_codes, IMPUTE_DEFAULTS)
+        else:
+            size = max(district_codes.values(), default=-1) + 1
+            tables = {f: np.full([size], v) for f, v in IMPUTE_DEFAULTS.items()}
+        self._district = self._position("location_district")
+        self._imputed = [
+            (
+                self._position(feature),
+                attr,
+                tables[feature],
+                VALID_RANGES.get(feature, (-np.inf, np.inf)),
+            )
+            for feature, attr in IMPUTED_INPUTS.items()
+        ]
+
+        covered = (
+            CATEGORICAL_INPUTS.keys()
+            | NUMERICAL_INPUTS.keys()
+            | IMPUTED_INPUTS.keys()
+            | CONSTANT_INPUTS.keys()
+        )
+        for feature in self.features:
+            if feature not in covered:
+                raise ValueError(f"Feature '{feature}' not found in form_data")
+
+    def _position(self, feature: str) -> int:
+        if feature not in self.positions:
+            raise ValueError(f"Feature '{feature}' not found in model features")
+        return self.positions[feature]
+
+    def _category_getter(self, feature: str, attr: str):
+        codes = self._codes[feature]
+        get_value = attrgetter(attr)
+
+        def getter(data: EstimateInput) -> int:
+            value = get_value(data)
+            try:
+                return codes[value]
+            except KeyError:
+                raise MappingError(feature, value) from None
+
+        return getter
+
+    def code(self, feature: str, value: str) -> int:
+        """Category code for a form value of a categorical feature."""
+        codes = self._codes.get(feature, {})
+        if value not in codes:
+            raise MappingError(feature, value)
+        return codes[value]
+
+    def _impute(self, data_array: np.ndarray) -> None:
+        """Replace missing (NaN) and out of range values of IMPUTED_INPUTS
+        with the medians of each row's district, in place."""
+        districts = data_array[:, self._district].astype(int)
+        for i, _, medians, (low, high) in self._imputed:
+            values = data_array[:, i]
+            missing = ~_in_range(values, low, high)
+            values[missing] = medians[districts[missing]]
+
+    def encode_into(self, data: EstimateInput, row: np.ndarray) -> np.ndarray:
+        """Write encoded features of a single input into a preallocated row."""
+        row[:] = self._template
+        for i, getter in self._setters:
+            row[i] = getter(data)
+        # _impute for a single row, without array overhead
+        district = int(row[self._district])
+        for i, attr, medians, (low, high) in self._imputed:
+            value = getattr(data, attr)
+            if value is None or not _in_range(value, low, high):
+                value = medians[district]
+            row[i] = value
+        if self.geocoder is not None:
+            row[self._geocoded] = self.geocoder.locate(data.location, data.district)
+        return row
+
+    def encode_grid(
+        self,
+        data: EstimateInput,
+        location: np.ndarray,
+        districts: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Encode `data` once per point, with the location features replaced.
+
+        `location` is an (n x 3) array of GEOCODED_FEATURES values. With
+        `districts` (names per point) the district, and values imputed from
+        it, change as well; unknown districts keep the one from `data`.
+        """
+        row = self.encode(data)[0]
+        grid = np.tile(row, (len(location), 1))
+        grid[:, self._geocoded] = location
+        if districts is None:
+            return grid
+
+        codes = self._codes["location_district"]
+        names, inverse = np.unique(districts, return_inverse=True)
+        name_codes = np.array([codes.get(name, row[self._district]) for name in names])
+        district_codes = name_codes[inverse].astype(int)
+        grid[:, self._district] = district_codes
+        for i, attr, _, _ in self._imputed:
+            value = getattr(data, attr)
+            grid[:, i] = np.nan if value is None else value
+        self._impute(grid)
+        return grid
+
+    def encode_columns(self, columns: dict) -> tuple[np.ndarray, np.ndarray]:
+        """Encode many inputs given column-wise, as one (n x n_features) array.
+
+        `columns` maps EstimateInput attributes to arrays of values, None or
+        NaN for missing ones (see listings_to_columns). Gives the same rows
+        as encode_batch, from the same tables and codes, but every feature
+        is filled for all rows at once and categories are looked up once per
+        distinct value. Instead of raising, returns the MappingError
+        message of every row with an unknown value ("" for encoded rows).
+        """
+        n = len(columns["area"])
+        data_array = np.tile(self._template, (n, 1))
+        errors = np.full(n, "", dtype=object)
+
+        for feature, attr in CATEGORICAL_INPUTS.items():
+            codes = self._codes[feature]
+            names, inverse = np.unique(np.asarray(columns[attr], dtype=str), return_inverse=True)
+            name_codes = np.array([codes.get(name, -1) for name in names], dtype=int)
+            for j in np.flatnonzero(name_codes < 0):
+                unknown = (inverse == j) & (errors == "")
+                errors[unknown] = str(MappingError(feature, names[j]))
+            # Rows with unknown values are not predicted, 0 keeps lookups valid
+            data_array[:, self.positions[feature]] = np.maximum(name_codes[inverse], 0)
+        for feature, attr in NUMERICAL_INPUTS.items():
+            data_array[:, self.positions[feature]] = np.asarray(columns[attr], dtype=float)
+
+        for i, attr, _, _ in self._imputed:
+            data_array[:, i] = np.asarray(columns[attr], dtype=float)
+        self._impute(data_array)
+
+        if self.geocoder is not None and n:
+            # Each distinct address is geocoded once
+            places: dict[tuple[str, str], int] = {}
+            inverse = [
+                places.setdefault(place, len(places))
+                for place in zip(columns["location"], columns["district"])
+            ]
+            points = np.array([self.geocoder.locate(*place) for place in places])
+            data_array[:, self._geocoded] = points[inverse]
+        return data_array, errors
+
+    def encode(self, data: EstimateInput) -> np.ndarray:
+        """Encode a single input as a (1 x n_features) array."""
+        data_array = np.empty([1, self.n_features])
+        self.encode_into(data, data_array[0])
+        return data_array
+
+    def encode_batch(self, data: list[EstimateInput]) -> np.ndarray:
+        """Encode many inputs as one (n x n_features) array."""
+        data_array = np.empty([len(data), self.n_features])
+        for row, item in zip(data_array, data):
+            self.encode_into(item, row)
+        return data_array
@@ -0,0 +1,106 @@
+import functools
+import re
+import unicodedata
+
+import numpy as np
+
+from .encoder import CONSTANT_INPUTS
+
+# Keep in sync with model/src/geocoder.py
+_PREFIXES = re.compile(r"\b(ul|al|os|pl|ulica|aleja|aleje|osiedle|plac|rondo)\b\.?")
+_NUMBERS = re.compile(r"\b\d+\w*(/\d+\w*)?\b")
+
+EARTH_RADIUS_KM = 6371
+# Same as in data_preprocessing.py, for models without a geocoder table
+DEFAULT_CENTER = (50.0619474, 19.9368564)
+
+
+def normalize_place(name: str) -> str:
+    """Street or area name as used in the geocoder tables, e.g. "ul. Łobzowska 12" -> "lobzowska"."""
+    name = name.lower().replace("ł", "l")
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    name = _NUMBERS.sub(" ", _PREFIXES.sub(" ", name))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name).split())
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great circle distance in kilometers, as in data_preprocessing.py.
+
+    Works on numbers and on numpy arrays.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * np.arcsin(np.sqrt(a)) * EARTH_RADIUS_KM
+
+
+class Geocoder:
+    """Address -> (location_lat, location_lon, distance_from_center).
+
+    Built from the table written by preprocess_data (median coordinates of
+    scraped listings per district and street/area). Distances are computed
+    here once, so a lookup is a string normalization and a few dict gets.
+    """
+
+    def __init__(self, table: dict):
+        self.center = center_lat, center_lon = tuple(table["center"])
+
+        def point(lat, lon) -> tuple[float, float, float]:
+            return (lat, lon, float(haversine(lat, lon, center_lat, center_lon)))
+
+        self.default = point(CONSTANT_INPUTS["location_lat"], CONSTANT_INPUTS["location_lon"])
+        self._districts = {
+            district: point(lat, lon) for district, (lat, lon) in table["districts"].items()
+        }
+        self._places: dict[tuple[str, str], tuple[float, float, float]] = {}
+        # Names found in a single district can be used when the district differs
+        districts_of_place: dict[str, list[str]] = {}
+        for district, places in table["places"].items():
+            for place, (lat, lon) in places.items():
+                self._places[(district, place)] = point(lat, lon)
+                districts_of_place.setdefault(place, []).append(district)
+        self._unique_places = {
+            place: self._places[(districts[0], place)]
+            for place, districts in districts_of_place.items()
+            if len(districts) == 1
+        }
+        # The same addresses come back often, remember recent lookups
+        # (per instance, so the cache goes away with the model)
+        self.locate = functools.lru_cache(maxsize=4096)(self.locate)
+
+    @classmethod
+    def from_preprocessing(cls, preprocessing: dict) -> "Geocoder | None":
+        """Geocoder of a model bundle, None for bundles built without one."""
+        table = preprocessing.get("geocoder")
+        return cls(table) if table else None
+
+    def nearest_districts(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Name of the district with the closest centre for every point."""
+        names = list(self._districts)
+        centers = np.array([self._districts[name][:2] for name in names])
+        # Squared degrees are enough to compare distances within a city
+        scale = np.cos(np.radians(self.center[0]))
+        d_lat = lats[:, None] - centers[None, :, 0]
+        d_lon = (lons[:, None] - centers[None, :, 1]) * scale
+        return np.array(names)[np.argmin(d_lat**2 + d_lon**2, axis=1)]
+
+    def locate(self, location: str, district: str) -> tuple[float, float, float]:
+        """Coordinates and distance to the centre for a free-text address.
+
+        Each comma separated part of the address is tried as a street/area of
+        the district, then of any district. Falls back to the district centre
+        and finally to the city centre defaults.
+        """
+        parts = [normalize_place(part) for part in location.split(",")]
+        for part in parts:
+            point = self._places.get((district, part))
+            if point is not None:
+                return point
+        for part in parts:
+            point = self._unique_places.get(part)
+            if point is not None:
+                return point
+        return self._districts.get(district, self.default)
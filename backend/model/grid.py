@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+
+from schemas.estimate import EstimateInput
+from .geocoder import DEFAULT_CENTER, haversine
+from .scheduler import DeadlineExceededError
+
+# (north, west, south, east) of the map used in scrapper/notebooks
+KRAKOW_BBOX = (50.144579, 19.757886, 49.972568, 20.120011)
+
+# Cells predicted in one booster call, the deadline is checked between calls
+CHUNK_SIZE = 4096
+
+# Points predicted along each side at most (~0.1ms per point with the
+# production model), larger grids are interpolated from them
+MAX_SAMPLES = 48
+
+
+def grid_points(
+    bbox: tuple[float, float, float, float], width: int, height: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Latitudes and longitudes of a grid, row by row from the north-west corner."""
+    north, west, south, east = bbox
+    lons, lats = np.meshgrid(
+        np.linspace(west, east, width), np.linspace(north, south, height)
+    )
+    return lats.ravel(), lons.ravel()
+
+
+def resample(coarse: np.ndarray, height: int, width: int) -> np.ndarray:
+    """Bilinear interpolation of a grid to `height` x `width` points over the same bbox."""
+    rows, cols = coarse.shape
+    ys = np.linspace(0, rows - 1, height)
+    xs = np.linspace(0, cols - 1, width)
+    y0 = np.minimum(ys.astype(int), rows - 2)
+    x0 = np.minimum(xs.astype(int), cols - 2)
+    fy = (ys - y0)[:, None]
+    fx = xs - x0
+    top = coarse[y0][:, x0] * (1 - fx) + coarse[y0][:, x0 + 1] * fx
+    bottom = coarse[y0 + 1][:, x0] * (1 - fx) + coarse[y0 + 1][:, x0 + 1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+def predict_grid(
+    artifact,
+    data: EstimateInput,
+    bbox: tuple[float, float, float, float],
+    width: int,
+    height: int,
+    deadline: float | None = None,
+) -> np.ndarray:
+    """Price per m² of the `data` flat placed at every point of a grid.
+
+    At most MAX_SAMPLES x MAX_SAMPLES points (including the corners) are
+    predicted, as one feature matrix CHUNK_SIZE cells at a time, and
+    larger grids are interpolated from them. With a geocoder each point
+    also gets the district with the nearest centre. Raises
+    DeadlineExceededError once `deadline` (`time.monotonic()`, the same
+    clock as the event loop's) has passed.
+    """
+    samples_x, samples_y = min(width, MAX_SAMPLES), min(height, MAX_SAMPLES)
+    prices = _predict_points(artifact, data, bbox, samples_x, samples_y, deadline)
+    if (samples_y, samples_x) != (height, width):
+        prices = resample(prices, height, width)
+    return prices
+
+
+def _predict_points(
+    artifact,
+    data: EstimateInput,
+    bbox: tuple[float, float, float, float],
+    width: int,
+    height: int,
+    deadline: float | None,
+) -> np.ndarray:
+    lats, lons = grid_points(bbox, width, height)
+    geocoder = artifact.encoder.geocoder
+    center = geocoder.center if geocoder is not None else DEFAULT_CENTER
+    location = np.column_stack([lats, lons, haversine(lats, lons, *center)])
+    districts = geocoder.nearest_districts(lats, lons) if geocoder is not None else None
+
+    grid = artifact.encoder.encode_grid(data, location, districts)
+    prices = np.empty([len(grid)], dtype=np.float32)
+    for start in range(0, len(grid), CHUNK_SIZE):
+        if deadline is not None and time.monotonic() > deadline:
+            raise DeadlineExceededError("Deadline exceeded")
+        prices[start : start + CHUNK_SIZE] = artifact.predict(grid[start : start + CHUNK_SIZE])
+    return (prices / data.area).reshape(height, width)
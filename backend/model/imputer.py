@@ -0,0 +1,52 @@
+import numpy as np
+
+# Model feature -> column of config["district_median"] (see preprocess_data)
+MEDIAN_COLUMNS = {
+    "build_year": "build_year_median",
+    "building_floors": "building_floors_median",
+}
+
+
+class DistrictImputer:
+    """Per-district medians used in training to fill missing numeric values.
+
+    `tables` turns them into arrays indexed by district code, so imputing a
+    value while encoding is a single array lookup.
+    """
+
+    def __init__(self, district_median: list[dict]):
+        self._medians: dict[str, dict[str, float]] = {
+            feature: {
+                record["location_district"]: record[column]
+                for record in district_median
+                if record.get(column) is not None
+            }
+            for feature, column in MEDIAN_COLUMNS.items()
+        }
+
+    @classmethod
+    def from_preprocessing(cls, preprocessing: dict) -> "DistrictImputer | None":
+        """Imputer of a model bundle, None if it has no district medians."""
+        district_median = preprocessing.get("district_median")
+        return cls(district_median) if district_median else None
+
+    def tables(
+        self, district_codes: dict[str, int], defaults: dict[str, float]
+    ) -> dict[str, np.ndarray]:
+        """{feature: array of medians indexed by district code}.
+
+        Districts without a median get the median over all districts, or
+        the value from `defaults` if there are none at all.
+        """
+        size = max(district_codes.values(), default=-1) + 1
+        tables = {}
+        for feature, medians in self._medians.items():
+            fallback = (
+                float(np.median(list(medians.values()))) if medians else defaults[feature]
+            )
+            table = np.full([size], fallback)
+            for district, code in district_codes.items():
+                if district in medians:
+                    table[code] = medians[district]
+            tables[feature] = table
+        return tables
@@ -0,0 +1,186 @@
+import ast
+import functools
+import re
+from typing import Annotated
+
+import numpy as np
+import pandas as pd
+from pydantic import TypeAdapter, ValidationError
+
+from schemas.estimate import EstimateInput
+from .encoder import TRANSLATIONS
+
+# Model value -> form value, e.g. "boiler_room" -> "miejskie"
+_FORM_VALUES = {
+    feature: {model_value: form_value for form_value, model_value in mapping.items()}
+    for feature, mapping in TRANSLATIONS.items()
+}
+
+# Used when a scraped value has no counterpart in the form
+_FORM_DEFAULTS = {
+    "ad_type": "prywatny",
+    "heating": "inne",
+    "market": "Wtórny",
+    "ownership": "Własnościowe",
+    "state": "Do zamieszkania",
+}
+
+CITY = "Kraków"
+
+
+def _number(value, default=None):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+    return default if number != number else number  # NaN
+
+
+def _floor(value) -> int:
+    """Same rules as _process_floor in model/src/data_preprocessing.py."""
+    if not isinstance(value, str) or value.strip() == "":
+        return 0
+    if value == "cellar":
+        return -1
+    if value == "ground_floor":
+        return 0
+    match = re.search(r"\d+", value)
+    return int(match.group()) if match else 0
+
+
+def _list(value) -> list[str]:
+    if isinstance(value, list):
+        return value
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def _form_value(feature: str, value) -> str:
+    return _FORM_VALUES[feature].get(value, _FORM_DEFAULTS[feature])
+
+
+def _optional_int(value) -> int | None:
+    # Missing values are imputed by the encoder, as in training
+    number = _number(value)
+    return int(number) if number else None
+
+
+# The rules below are shared by listing_to_input and listings_to_columns, so
+# bulk scoring encodes listings exactly as they would be encoded one by one
+
+# EstimateInput attribute -> (CSV column, value from the column's value)
+_FIELDS = {
+    "area": ("area", lambda value: _number(value, 0.0)),
+    "rooms": ("rooms", lambda value: int(_number(value, 1))),
+    "floor": ("floor", _floor),
+    "floorsInBuilding": ("building_floors", _optional_int),
+    "build_year": ("build_year", _optional_int),
+    **{
+        feature: (feature, functools.partial(_form_value, feature))
+        for feature in _FORM_DEFAULTS
+    },
+}
+
+# EstimateInput attribute -> value from the parts of `location`.
+# District is taken the same way as in add_district.py
+_LOCATION_FIELDS = {
+    "location": lambda parts: ", ".join(parts[:1]),
+    "district": lambda parts: parts[1] if len(parts) > 1 else "",
+}
+
+# EstimateInput attribute -> utilities any of which make it true
+_UTILITY_FIELDS = {
+    "balcony": ("balkon", "taras"),
+    "separate_kitchen": ("oddzielna kuchnia",),
+    "garage": ("garaż/miejsce parkingowe",),
+    "elevator": ("winda",),
+    "basement": ("piwnica", "pom. użytkowe"),
+}
+
+_CONSTANT_FIELDS = {"city": CITY, "available": "od zaraz"}
+
+# Validators of the EstimateInput fields with constraints (e.g. area > 0)
+_CONSTRAINED_FIELDS = {
+    name: TypeAdapter(Annotated[(field.annotation, *field.metadata)])
+    for name, field in EstimateInput.model_fields.items()
+    if field.metadata
+}
+
+
+def _has_any(parts: list[str], utilities: tuple[str, ...]) -> bool:
+    return any(utility in parts for utility in utilities)
+
+
+def listing_to_input(row: dict) -> EstimateInput:
+    """Convert a scraped listing (a row of scrapper's CSV) to an EstimateInput.
+
+    Values that the form cannot express fall back to the form defaults.
+    """
+    location = _list(row.get("location"))
+    utilities = _list(row.get("utilities"))
+    return EstimateInput(
+        **_CONSTANT_FIELDS,
+        **{attr: rule(row.get(column)) for attr, (column, rule) in _FIELDS.items()},
+        **{attr: rule(location) for attr, rule in _LOCATION_FIELDS.items()},
+        **{attr: _has_any(utilities, names) for attr, names in _UTILITY_FIELDS.items()},
+    )
+
+
+def _per_value(values, rules: dict) -> dict[str, np.ndarray]:
+    """Apply every rule once per distinct value, as {name: value per row}."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    results = {}
+    for name, rule in rules.items():
+        result = np.empty(len(uniques), dtype=object)
+        result[:] = [rule(value) for value in uniques]
+        results[name] = result[codes]
+    return results
+
+
+def listings_to_columns(rows: list[dict]) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    """listing_to_input for many scraped rows at once, column by column.
+
+    Returns EstimateInput attribute -> array of values (as taken by
+    FeatureEncoder.encode_columns) and the validation error of every row
+    EstimateInput would reject ("" otherwise). The rules of listing_to_input
+    are applied once per distinct value of a column.
+    """
+    n = len(rows)
+    columns = {attr: np.full(n, value, dtype=object) for attr, value in _CONSTANT_FIELDS.items()}
+    for attr, (column, rule) in _FIELDS.items():
+        columns.update(_per_value([row.get(column) for row in rows], {attr: rule}))
+
+    def parsed(rule):
+        return lambda value: rule(_list(value))
+
+    location = [row.get("location") for row in rows]
+    columns.update(
+        _per_value(location, {attr: parsed(rule) for attr, rule in _LOCATION_FIELDS.items()})
+    )
+    utilities = [row.get("utilities") for row in rows]
+    columns.update(
+        _per_value(
+            utilities,
+            {
+                attr: parsed(functools.partial(_has_any, utilities=names))
+                for attr, names in _UTILITY_FIELDS.items()
+            },
+        )
+    )
+
+    errors = np.full(n, "", dtype=object)
+    for name, adapter in _CONSTRAINED_FIELDS.items():
+
+        def error(value, adapter=adapter, name=name) -> str:
+            try:
+                adapter.validate_python(value)
+            except ValidationError as e:
+                return f"{name}: {e.errors()[0]['msg']}"
+            return ""
+
+        field_errors = _per_value(columns[name], {name: error})[name]
+        errors = np.where(errors == "", field_errors, errors)
+    return columns, errors
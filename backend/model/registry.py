@@ -0,0 +1,155 @@
+import asyncio
+import glob
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+BUNDLE_SUFFIX = "_bundle.zip"
+
+# Display names of cities whose slug can't be turned back into the name
+CITY_NAMES = {"krakow": "Kraków"}
+
+
+class UnknownCityError(LookupError):
+    """No model bundle exists for the requested city."""
+
+    status_code = 404
+
+
+def city_slug(city: str) -> str:
+    """Name used in bundle file names, e.g. "Kraków" -> "krakow"."""
+    city = city.strip().lower().replace("ł", "l")
+    city = unicodedata.normalize("NFKD", city)
+    city = "".join(c for c in city if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", "_", city).strip("_")
+
+
+def city_name(slug: str) -> str:
+    return CITY_NAMES.get(slug, slug.replace("_", " ").title())
+
+
+class ModelRegistry:
+    """Per-city models, loaded on first use.
+
+    Bundles are looked up as `<bundle_dir>/<city slug>_bundle.zip`. Loaded
+    models are kept in LRU order and the least recently used ones are dropped
+    once their estimated memory exceeds `memory_budget` bytes. The default
+    city is loaded at startup and never evicted.
+    """
+
+    def __init__(
+        self,
+        model_class,
+        bundle_dir: str,
+        default_city: str,
+        default_bundle: str | None = None,
+        memory_budget: int = 1 << 30,
+        **model_options,
+    ):
+        self._model_class = model_class
+        # Passed to every model created, e.g. cache_size or nthread
+        self.model_options = model_options
+        self.bundle_dir = bundle_dir
+        self.default_city = city_slug(default_city)
+        self._default_bundle = default_bundle
+        self.memory_budget = memory_budget
+        self._lock = threading.Lock()
+        self._load_locks: dict[str, threading.Lock] = {}
+
+        self.default = self._create_model(self.bundle_path(self.default_city))
+        self._models: OrderedDict[str, object] = OrderedDict(
+            {self.default_city: self.default}
+        )
+
+    def _create_model(self, bundle_path: str):
+        return self._model_class(bundle_path, lazy=True, **self.model_options)
+
+    def bundle_path(self, slug: str) -> str:
+        if slug == self.default_city and self._default_bundle:
+            return self._default_bundle
+        return os.path.join(self.bundle_dir, f"{slug}{BUNDLE_SUFFIX}")
+
+    def cities(self) -> list[str]:
+        """Slugs of all cities with a model bundle."""
+        pattern = os.path.join(glob.escape(self.bundle_dir), f"*{BUNDLE_SUFFIX}")
+        slugs = {os.path.basename(path)[: -len(BUNDLE_SUFFIX)] for path in glob.glob(pattern)}
+        slugs.add(self.default_city)
+        return sorted(slugs)
+
+    def city_names(self) -> list[str]:
+        return [city_name(slug) for slug in self.cities()]
+
+    def loaded(self) -> dict[str, object]:
+        with self._lock:
+            return dict(self._models)
+
+    def get_loaded(self, city: str):
+        """Model of a city if it's already in memory (never blocks on loading)."""
+        slug = city_slug(city)
+        with self._lock:
+            model = self._models.get(slug)
+            if model is not None:
+                self._models.move_to_end(slug)
+            return model
+
+    def get(self, city: str):
+        """Model of a city, loading its bundle if needed."""
+        model = self.get_loaded(city)
+        if model is not None:
+            return model
+
+        slug = city_slug(city)
+        path = self.bundle_path(slug)
+        if not slug or not os.path.exists(path):
+            raise UnknownCityError(f"No model for city '{city}'")
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(slug, threading.Lock())
+        # Only one thread loads a given city, others wait for it
+        with load_lock:
+            model = self.get_loaded(city)
+            if model is None:
+                model = self._create_model(path)
+                model.load()
+                with self._lock:
+                    self._models[slug] = model
+                    self._evict(keep=slug)
+        return model
+
+    async def get_async(self, city: str):
+        """Like get, but loads a missing model off the event loop."""
+        model = self.get_loaded(city)
+        if model is None:
+            model = await asyncio.to_thread(self.get, city)
+        return model
+
+    def cache_stats(self) -> dict[str, int | float]:
+        """Prediction cache stats summed over the models in memory."""
+        total: dict[str, int | float] = {}
+        for model in self.loaded().values():
+            for key, value in model.cache_stats().items():
+                if key == "ttl":
+                    total[key] = value
+                else:
+                    total[key] = total.get(key, 0) + value
+        return total
+
+    def memory_used(self) -> int:
+        with self._lock:
+            return sum(m.memory_estimate for m in self._models.values())
+
+    def _evict(self, keep: str) -> None:
+        # Caller holds self._lock
+        used = sum(m.memory_estimate for m in self._models.values())
+        for slug in list(self._models):
+            if used <= self.memory_budget:
+                break
+            if slug in (keep, self.default_city):
+                continue
+            model = self._models.pop(slug)
+            used -= model.memory_estimate
+            # In-flight requests keep their artifact, the rest is freed
+            model.clear_cache()
+            print(f">>> Evicted model for {slug}")
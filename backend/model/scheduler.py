@@ -0,0 +1,127 @@
+import asyncio
+from typing import Any, Callable
+
+import numpy as np
+
+# Queued row, its context, the caller's future and deadline
+_Item = tuple[np.ndarray, Any, asyncio.Future, float | None]
+
+
+class DeadlineExceededError(TimeoutError):
+    """The row's deadline passed before it could be predicted."""
+
+
+class InferenceScheduler:
+    """Micro-batcher that runs model predictions off the event loop.
+
+    Requests queue single encoded rows and await their own result. A worker
+    task collects queued rows into one batch and runs `predict` on a thread.
+    A batch is flushed once it reaches `max_batch_size` rows or `max_delay`
+    seconds after its first row arrived. The delay is only spent when the
+    previous batch had more than one row, so a lone request under light
+    traffic is not held back.
+
+    Rows queued with a different `context` (e.g. the model and artifact they
+    were encoded for) are predicted in separate calls. Contexts are compared
+    by equality, so they must be hashable.
+
+    Rows whose `deadline` (event loop time) has passed by the time their
+    batch runs are not predicted, their callers get DeadlineExceededError.
+    Any error while running a batch (e.g. rows of different widths after a
+    reload) is set on that batch's futures only.
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[np.ndarray, Any], np.ndarray],
+        max_batch_size: int = 64,
+        max_delay: float = 0.002,
+    ):
+        self._predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._concurrent = False
+
+    def start(self) -> None:
+        """Start the worker task on the running event loop."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._queue = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Rows waiting for the next batch."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def predict(
+        self, row: np.ndarray, context: Any = None, deadline: float | None = None
+    ) -> float:
+        """Queue one encoded row and wait for its prediction."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, context, future, deadline))
+        return await future
+
+    async def _collect(self) -> list[_Item]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.max_delay if self._concurrent else 0.0)
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            self._concurrent = len(batch) > 1
+
+            groups: dict[Any, list[_Item]] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            for group in groups.values():
+                try:
+                    await self._flush(group)
+                except Exception as e:
+                    # A bad batch fails its own requests, the worker keeps going
+                    for _, _, future, _ in group:
+                        if not future.done():
+                            future.set_exception(e)
+
+    async def _flush(self, batch: list[_Item]):
+        now = asyncio.get_running_loop().time()
+        expired = [item for item in batch if item[3] is not None and item[3] < now]
+        for _, _, future, _ in expired:
+            if not future.done():
+                future.set_exception(DeadlineExceededError("Deadline exceeded"))
+        batch = [item for item in batch if item[3] is None or item[3] >= now]
+        if not batch:
+            return
+
+        rows = np.vstack([row for row, _, _, _ in batch])
+        prices = await asyncio.to_thread(self._predict, rows, batch[0][1])
+        for (_, _, future, _), price in zip(batch, prices):
+            if not future.done():
+                future.set_result(float(price))
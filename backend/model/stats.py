@@ -0,0 +1,63 @@
+import numpy as np
+
+# Key of the whole city in the statistics
+ALL_DISTRICTS = "*"
+
+STAT_NAMES = (
+    "count",
+    "price_median",
+    "price_m2_median",
+    "price_m2_q25",
+    "price_m2_q75",
+    "area_median",
+    "build_year_median",
+)
+
+
+def _median(values: np.ndarray) -> float | None:
+    values = values[~np.isnan(values)]
+    return float(np.median(values)) if len(values) else None
+
+
+def _summary(a: dict[str, np.ndarray], mask: np.ndarray) -> dict:
+    price = a["price"][mask]
+    area = a["area"][mask]
+    price_m2 = price / area
+    build_year = a["build_year"][mask] if "build_year" in a else np.array([])
+    q25, q75 = np.percentile(price_m2, [25, 75]) if len(price_m2) else (None, None)
+    return {
+        "count": int(mask.sum()),
+        "price_median": _median(price),
+        "price_m2_median": _median(price_m2),
+        "price_m2_q25": None if q25 is None else float(q25),
+        "price_m2_q75": None if q75 is None else float(q75),
+        "area_median": _median(area),
+        "build_year_median": _median(build_year.astype(np.float64)),
+    }
+
+
+def district_stats(
+    districts: list[str], comparables=None, preprocessing: dict | None = None
+) -> dict[str, dict]:
+    """Statistics of every district (and of the city as ALL_DISTRICTS).
+
+    Computed from the listings shipped with the model (comparables). For
+    bundles without them, only the medians from the preprocessing config
+    are known.
+    """
+    if comparables is not None:
+        a = comparables.arrays
+        stats = {ALL_DISTRICTS: _summary(a, np.ones(len(a["price"]), dtype=bool))}
+        for district in districts:
+            stats[district] = _summary(a, a["district"] == district)
+        return stats
+
+    medians = {
+        record["location_district"]: record.get("build_year_median")
+        for record in (preprocessing or {}).get("district_median", [])
+    }
+    stats = {ALL_DISTRICTS: dict.fromkeys(STAT_NAMES)}
+    for district in districts:
+        stats[district] = dict.fromkeys(STAT_NAMES)
+        stats[district]["build_year_median"] = medians.get(district)
+    return stats
@@ -0,0 +1,80 @@
+import asyncio
+import os
+from typing import Callable
+
+
+class ModelWatcher:
+    """Polls model bundles and reloads models whose bundle has changed.
+
+    `models` returns the models currently in memory, so cities loaded later
+    are picked up and evicted ones are no longer reloaded. A model that
+    failed to load (e.g. no bundle at startup) is loaded once its bundle
+    appears or changes. A failed reload is not retried until the bundle
+    changes again.
+
+    Polling the modification time works on read-only bind mounts, where
+    filesystem events are not always delivered into the container.
+    """
+
+    def __init__(self, models: Callable[[], dict], interval: float = 30.0):
+        self._models = models
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+        # {bundle path: mtime of the bundle last (re)loaded or tried}
+        self._mtimes: dict[str, float] = {}
+        self._read_mtimes()
+
+    def _mtime(self, path: str) -> float | None:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    def _read_mtimes(self) -> list:
+        """Models whose bundle changed since the last check."""
+        changed = []
+        for model in self._models().values():
+            mtime = self._mtime(model.bundle_path)
+            if mtime is None:
+                continue
+            previous = self._mtimes.get(model.bundle_path)
+            if previous is None:
+                self._mtimes[model.bundle_path] = mtime
+                # The bundle appeared after the model failed to load
+                if not model.ready and model.load_error is not None:
+                    changed.append((model, mtime))
+            elif mtime != previous:
+                changed.append((model, mtime))
+        return changed
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            for model, mtime in self._read_mtimes():
+                # Files may still be being written, then they change again
+                # and are tried again, otherwise only after the next change
+                self._mtimes[model.bundle_path] = mtime
+                try:
+                    if model.ready:
+                        await asyncio.to_thread(model.reload)
+                    else:
+                        # Records the error for /healthz if it fails again
+                        await asyncio.to_thread(model.load)
+                except Exception as e:
+                    print(f">>> Model reload failed: {str(e)}")
+                    continue
+                print(f">>> Model reloaded, now serving {model.version}")
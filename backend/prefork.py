@@ -0,0 +1,82 @@
+import gc
+import os
+import signal
+import socket
+from typing import Callable
+
+import uvicorn
+
+
+def _run_worker(app, sock: socket.socket, log_level: str) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(
+    app,
+    host: str,
+    port: int,
+    workers: int,
+    preload: Callable[[], None] | None = None,
+    log_level: str = "info",
+) -> None:
+    """Serve `app` from `workers` processes forked from this one.
+
+    `preload` runs once in this (parent) process before forking, so whatever
+    it loads - the model bundle - is shared by all workers copy-on-write
+    instead of being loaded again in every worker. Workers that die are
+    restarted. Linux/macOS only (needs os.fork).
+    """
+    if preload is not None:
+        preload()
+    # Move everything loaded so far out of the GC's reach - otherwise GC
+    # passes in the workers write to those objects and un-share their pages
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    pids: set[int] = set()
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(app, sock, log_level)
+            finally:
+                os._exit(0)
+        pids.add(pid)
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for _ in range(workers):
+        spawn()
+    print(f">>> Started {workers} workers: {sorted(pids)}")
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while pids:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        pids.discard(pid)
+        if not stopping:
+            print(f">>> Worker {pid} exited with status {status}, restarting")
+            spawn()
+
+    sock.close()
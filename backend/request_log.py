@@ -0,0 +1,35 @@
+"""Sampled structured (JSON lines) logging of the request path.
+
+WYCENAPPKA_LOG_SAMPLE_RATE is the fraction of requests that get logged:
+1 logs everything (default in development), 0 turns it off (default in
+production).
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+
+_default_rate = "0" if os.environ.get("WYCENAPPKA_PROD", "").lower() == "true" else "1"
+SAMPLE_RATE = float(os.environ.get("WYCENAPPKA_LOG_SAMPLE_RATE", _default_rate))
+
+logger = logging.getLogger("wycenappka.requests")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def sampled() -> bool:
+    """Whether the current request should be logged. Check it before
+    building log fields, so unsampled requests cost nothing."""
+    if SAMPLE_RATE <= 0:
+        return False
+    return SAMPLE_RATE >= 1 or random.random() < SAMPLE_RATE
+
+
+def log_event(event: str, **fields) -> None:
+    logger.info(json.dumps({"event": event, **fields}, default=str, ensure_ascii=False))
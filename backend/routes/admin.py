@@ -0,0 +1,52 @@
+import asyncio
+import os
+import secrets
+
+from fastapi import APIRouter, Header, HTTPException
+
+from model import registry
+
+router = APIRouter(prefix="/admin")
+
+ADMIN_TOKEN = os.environ.get("WYCENAPPKA_ADMIN_TOKEN", "")
+
+
+def _check_token(token: str | None) -> None:
+    # Without a configured token admin routes are disabled
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin routes are disabled")
+    if not secrets.compare_digest(token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/model")
+async def get_model(
+    city: str | None = None, x_admin_token: str | None = Header(default=None)
+) -> dict:
+    _check_token(x_admin_token)
+    model = await registry.get_async(city) if city else registry.default
+    artifact = model.artifact
+    return {
+        "version": artifact.version,
+        "loaded_at": artifact.loaded_at,
+        "bundle_path": model.bundle_path,
+        "created_at": artifact.manifest.get("created_at"),
+        "loaded_cities": list(registry.loaded()),
+        "memory_estimate": registry.memory_used(),
+    }
+
+
+@router.post("/reload")
+async def reload_model(
+    city: str | None = None, x_admin_token: str | None = Header(default=None)
+) -> dict:
+    """Load the model bundle again and swap them in without stopping the server."""
+    _check_token(x_admin_token)
+    model = await registry.get_async(city) if city else registry.default
+    # Nothing loaded yet, e.g. the startup load failed
+    previous = model.version if model.ready else None
+    try:
+        version = await asyncio.to_thread(model.reload)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed: {str(e)}")
+    return {"previous_version": previous, "version": version}
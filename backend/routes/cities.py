@@ -1,24 +1,70 @@
-from fastapi import APIRouter
+import json
+import weakref
 
+from fastapi import APIRouter, Request, Response
+
+from metrics import TimedRoute
 from schemas.city import City
-from schemas.district import District, DistrictOutput
-from model import model
+from schemas.district import CityStats, DistrictOutput
+from model import registry
+from model.registry import city_name as display_name, city_slug
+from model.stats import ALL_DISTRICTS
+
+router = APIRouter(prefix="/cities", route_class=TimedRoute)
+
+# Responses only change with the model, clients revalidate with the ETag
+CACHE_CONTROL = "public, max-age=300"
+
+# {artifact: {path: JSON body}}, dropped together with the artifact
+_bodies: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
 
-router = APIRouter(prefix="/cities")
+
+def _cached_json(request: Request, artifact, name: str, build) -> Response:
+    """Response rendered once per model version, 304 if the client has it."""
+    bodies = _bodies.setdefault(artifact, {})
+    if name not in bodies:
+        bodies[name] = json.dumps(build(), ensure_ascii=False).encode()
+
+    headers = {"ETag": f'"{artifact.version}"', "Cache-Control": CACHE_CONTROL}
+    if headers["ETag"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(bodies[name], media_type="application/json", headers=headers)
 
 
 @router.get("/")
 async def get_cities() -> list[City]:
-    return [
-        City(name="Kraków"),
-    ]
+    return [City(name=name) for name in registry.city_names()]
+
 
+@router.get("/{city_name}", response_model=list[DistrictOutput])
+async def get_city(city_name: str, request: Request) -> Response:
+    model = await registry.get_async(city_name)
+    artifact = model.artifact
+    return _cached_json(
+        request,
+        artifact,
+        "districts",
+        lambda: [{"name": name} for name in artifact.districts],
+    )
 
-@router.get("/{city_name}")
-async def get_city(city_name: str) -> list[DistrictOutput]:
-    city = City(name=city_name)
 
-    return [
-        DistrictOutput.model_validate(District(city=city, name=name).model_dump())
-        for name in model.get_districts()
-    ]
+@router.get("/{city_name}/stats", response_model=CityStats)
+async def get_city_stats(city_name: str, request: Request) -> Response:
+    """Price, area and build year statistics per district of the training data."""
+    model = await registry.get_async(city_name)
+    artifact = model.artifact
+    stats = artifact.district_stats
+    # The manifest has the slug ("krakow"), districts have display names
+    city = display_name(city_slug(artifact.manifest.get("city") or city_name))
+    return _cached_json(
+        request,
+        artifact,
+        "stats",
+        lambda: {
+            "model_version": artifact.version,
+            "total": {"name": city, **stats[ALL_DISTRICTS]},
+            "districts": [
+                {"name": name, **stats[name]} for name in artifact.districts
+            ],
+        },
+    )
@@ -1,15 +1,200 @@
-from fastapi import APIRouter
+import asyncio
 
-from schemas.estimate import EstimateInput, EstimateOutput
-from model import model
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
 
-router = APIRouter(prefix="")
+from schemas.estimate import (
+    ComparableListing,
+    EstimateExplanation,
+    EstimateInput,
+    EstimateOutput,
+    GridInput,
+    GridOutput,
+)
+from admission import admission, admit, admit_rows
+from metrics import MAPPING_ERRORS, STAGE_SECONDS, TimedRoute
+from model import DeadlineExceededError, registry, scheduler
+from model.comparables import FEATURES as COMPARABLE_FEATURES
+from model.encoder import MappingError
+from model.grid import MAX_SAMPLES
+from request_log import log_event, sampled
+
+router = APIRouter(prefix="", route_class=TimedRoute)
+
+# Rows predicted in one call for batches, the deadline is checked between calls
+BATCH_CHUNK_SIZE = 1024
+
+
+def _grid_cells(body: dict) -> int:
+    """Points of a grid that are predicted, the rest is interpolated."""
+    width = int(body.get("width", GridInput.model_fields["width"].default))
+    height = int(body.get("height", GridInput.model_fields["height"].default))
+    return min(width, MAX_SAMPLES) * min(height, MAX_SAMPLES)
+
+
+def _round_price(price: float) -> int:
+    return int(price / 1000) * 1000
+
+
+def _mapping_error(e: MappingError) -> HTTPException:
+    MAPPING_ERRORS.inc(feature=e.feature)
+    return HTTPException(status_code=422, detail=str(e))
 
 
 @router.post("/estimate")
-async def get_estimate(data: EstimateInput) -> EstimateOutput:
-    print(data)
-    estimate_price = int(model.predict(data) / 1000) * 1000
-    print(estimate_price)
-    estimate = EstimateOutput.model_validate({"price": estimate_price})
+async def get_estimate(
+    data: EstimateInput, deadline: float = Depends(admit)
+) -> EstimateOutput:
+    model = await registry.get_async(data.city)
+    # Use one artifact for the whole request, even if a reload happens meanwhile
+    artifact = model.artifact
+    try:
+        with STAGE_SECONDS.time(route="/estimate", stage="encoding"):
+            row = artifact.encoder.encode(data)[0]
+    except MappingError as e:
+        raise _mapping_error(e)
+
+    price = model.cached_prediction(row, artifact)
+    if price is None:
+        try:
+            price = await scheduler.predict(row, (model, artifact), deadline)
+        except DeadlineExceededError:
+            raise admission.reject("/estimate", "deadline")
+    estimate_price = _round_price(price)
+    if sampled():
+        log_event(
+            "estimate",
+            input=data.model_dump(mode="json"),
+            price=estimate_price,
+            city=data.city,
+            model_version=artifact.version,
+        )
+    estimate = EstimateOutput.model_validate(
+        {"price": estimate_price, "model_version": artifact.version}
+    )
     return estimate
+
+
+@router.post("/estimate/batch")
+async def get_estimate_batch(
+    data: list[EstimateInput], deadline: float = Depends(admit_rows(len))
+) -> list[EstimateOutput]:
+    # Rows of each city go to that city's model, BATCH_CHUNK_SIZE at a time
+    by_city: dict[str, list[int]] = {}
+    for i, item in enumerate(data):
+        by_city.setdefault(item.city, []).append(i)
+
+    prices = np.empty([len(data)], dtype=np.float32)
+    versions: list[str | None] = [None] * len(data)
+    for city, indices in by_city.items():
+        model = await registry.get_async(city)
+        artifact = model.artifact
+        rows = [data[i] for i in indices]
+        admission.check_deadline("/estimate/batch", deadline)
+        try:
+            with STAGE_SECONDS.time(route="/estimate/batch", stage="encoding"):
+                data_array = await asyncio.to_thread(artifact.encoder.encode_batch, rows)
+        except MappingError as e:
+            raise _mapping_error(e)
+
+        for start in range(0, len(indices), BATCH_CHUNK_SIZE):
+            admission.check_deadline("/estimate/batch", deadline)
+            chunk = slice(start, start + BATCH_CHUNK_SIZE)
+            prices[indices[chunk]] = await asyncio.to_thread(
+                model.predict_encoded, data_array[chunk], artifact
+            )
+        for i in indices:
+            versions[i] = artifact.version
+
+    if sampled():
+        log_event("estimate_batch", rows=len(data), cities=sorted(by_city))
+    return [
+        EstimateOutput(price=_round_price(price), model_version=version)
+        for price, version in zip(prices, versions)
+    ]
+
+
+@router.post("/estimate/explain")
+async def get_estimate_explanation(
+    data: EstimateInput, exact: bool = False, deadline: float = Depends(admit)
+) -> EstimateExplanation:
+    """Estimate with per-feature contributions, which add up to the price.
+
+    Contributions are approximate by default; `exact=true` returns SHAP
+    values, which take several times longer to compute.
+    """
+    model = await registry.get_async(data.city)
+    artifact = model.artifact
+    # A single call that can't be stopped, so only started within the deadline
+    admission.check_deadline("/estimate/explain", deadline)
+    try:
+        explanation = await asyncio.to_thread(model.explain, data, artifact, exact)
+    except MappingError as e:
+        raise _mapping_error(e)
+
+    explanation["price"] = _round_price(explanation["price"])
+    return EstimateExplanation.model_validate(
+        {**explanation, "model_version": artifact.version}
+    )
+
+
+@router.post("/estimate/grid")
+async def get_estimate_grid(
+    data: GridInput, deadline: float = Depends(admit_rows(_grid_cells))
+) -> GridOutput:
+    """Price per m² of the reference flat at every point of a lat/lon grid."""
+    model = await registry.get_async(data.reference.city)
+    artifact = model.artifact
+    bbox = (data.north, data.west, data.south, data.east)
+    try:
+        grid = await asyncio.to_thread(
+            model.predict_grid,
+            data.reference,
+            bbox,
+            data.width,
+            data.height,
+            artifact,
+            deadline,
+        )
+    except MappingError as e:
+        raise _mapping_error(e)
+    except DeadlineExceededError:
+        raise admission.reject("/estimate/grid", "deadline")
+
+    return GridOutput(
+        model_version=artifact.version,
+        north=data.north,
+        west=data.west,
+        south=data.south,
+        east=data.east,
+        width=data.width,
+        height=data.height,
+        price_m2=grid.round().astype(int).tolist(),
+    )
+
+
+@router.post("/estimate/comparables", dependencies=[Depends(admit)])
+async def get_comparables(
+    data: EstimateInput, n: int = Query(default=10, ge=1, le=100)
+) -> list[ComparableListing]:
+    """Scraped listings most similar to the input (location, area, rooms, floor)."""
+    model = await registry.get_async(data.city)
+    artifact = model.artifact
+    if artifact.comparables is None:
+        raise HTTPException(status_code=404, detail="Model has no comparables index")
+    try:
+        row = artifact.encoder.encode(data)[0]
+    except MappingError as e:
+        raise _mapping_error(e)
+
+    # Location comes from the geocoder, so it matches what the model sees
+    features = row[[artifact.encoder.positions[f] for f in COMPARABLE_FEATURES]]
+    with STAGE_SECONDS.time(route="/estimate/comparables", stage="search"):
+        listings = artifact.comparables.query(features, n)
+    return [ComparableListing.model_validate(listing) for listing in listings]
+
+
+@router.get("/estimate/cache")
+async def get_estimate_cache() -> dict[str, int | float]:
+    """Cache stats summed over the models in memory."""
+    return registry.cache_stats()
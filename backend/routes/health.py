@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Request, Response
+
+from model import model
+
+router = APIRouter(prefix="")
+
+
+@router.get("/healthz")
+async def get_health(request: Request, response: Response) -> dict:
+    """Readiness probe - OK only once the model is loaded and warmed up."""
+    if not model.ready:
+        response.status_code = 503
+        status = "error" if model.load_error else "loading"
+        return {"status": status, "error": model.load_error}
+
+    startup = {"app_import": getattr(request.app.state, "import_time", None)}
+    startup.update({f"model_{k}": v for k, v in model.load_timings.items()})
+    return {"status": "ready", "model_version": model.version, "startup": startup}
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Response
+
+from metrics import (
+    CACHE_HITS,
+    CACHE_MISSES,
+    CACHE_SIZE,
+    CONTENT_TYPE,
+    REGISTRY,
+    SCHEDULER_QUEUE,
+)
+from model import registry, scheduler
+
+router = APIRouter(prefix="")
+
+
+@router.get("/metrics")
+async def get_metrics() -> Response:
+    """Metrics in Prometheus text format."""
+    stats = registry.cache_stats()
+    CACHE_HITS.set(stats["hits"])
+    CACHE_MISSES.set(stats["misses"])
+    CACHE_SIZE.set(stats["size"])
+    SCHEDULER_QUEUE.set(scheduler.queue_depth)
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
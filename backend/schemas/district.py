@@ -9,3 +9,20 @@ class District(BaseModel):
 
 class DistrictOutput(BaseModel):
     name: str
+
+
+class DistrictStats(BaseModel):
+    name: str
+    count: int | None
+    price_median: float | None
+    price_m2_median: float | None
+    price_m2_q25: float | None
+    price_m2_q75: float | None
+    area_median: float | None
+    build_year_median: float | None
+
+
+class CityStats(BaseModel):
+    model_version: str
+    total: DistrictStats
+    districts: list[DistrictStats]
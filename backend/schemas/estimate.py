@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from enum import Enum
 
 
@@ -43,10 +43,11 @@ class EstimateInput(BaseModel):
     location: str
     city: str
     district: str
-    area: float
+    area: float = Field(gt=0)
     rooms: int
     floor: int
-    floorsInBuilding: int
+    floorsInBuilding: int | None = None  # district median if not given
+    build_year: int | None = None  # district median if not given
 
     balcony: bool
     separate_kitchen: bool
@@ -67,3 +68,58 @@ class EstimateInput(BaseModel):
 
 class EstimateOutput(BaseModel):
     price: int
+    model_version: str | None = None
+
+
+class ComparableListing(BaseModel):
+    price: float
+    price_m2: float
+    area: float
+    rooms: int
+    floor: int
+    district: str
+    location_lat: float
+    location_lon: float
+    distance: float  # in scaled feature space, lower is more similar
+
+
+class FeatureContribution(BaseModel):
+    feature: str
+    value: float | str
+    contribution: float  # in PLN, positive raises the price
+
+
+class EstimateExplanation(BaseModel):
+    price: int
+    model_version: str | None = None
+    base_value: float  # price before any feature is taken into account
+    contributions: list[FeatureContribution]
+
+
+class GridInput(BaseModel):
+    reference: EstimateInput
+    # Bounding box, defaults to the map used in scrapper/notebooks
+    north: float = 50.144579
+    west: float = 19.757886
+    south: float = 49.972568
+    east: float = 20.120011
+    # Above 48 points per side, grids are interpolated (see model/grid.py)
+    width: int = Field(default=200, ge=2, le=200)
+    height: int = Field(default=200, ge=2, le=200)
+
+    @model_validator(mode="after")
+    def check_bbox(self) -> "GridInput":
+        if self.north <= self.south or self.east <= self.west:
+            raise ValueError("Bounding box needs north > south and east > west")
+        return self
+
+
+class GridOutput(BaseModel):
+    model_version: str
+    north: float
+    west: float
+    south: float
+    east: float
+    width: int
+    height: int
+    price_m2: list[list[int]]  # rows from north to south, west to east
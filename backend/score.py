@@ -0,0 +1,169 @@
+"""Bulk scoring of scraped listings with the serving model.
+
+Reads a CSV written by the scrapper in chunks, encodes every listing the same
+way as /estimate does (column by column for a whole chunk) and writes the
+input rows with the predicted price appended. Only a few chunks are in memory at a time, so memory doesn't grow
+with the size of the file.
+
+Run from the backend directory:
+
+    $ python score.py ../scrapper/otodom.csv --output predictions.csv
+    $ python score.py ../scrapper/otodom.csv --output predictions.csv --workers 4
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from model.artifact import ModelArtifact, load_artifact
+from model.listings import listings_to_columns
+
+PRICE_COLUMN = "predicted_price"
+ERROR_COLUMN = "error"
+
+# Set in every process that scores chunks (see _init_scorer)
+_artifact: ModelArtifact | None = None
+
+
+def _init_scorer(bundle_path: str, nthread: int | None) -> None:
+    global _artifact
+    _artifact = load_artifact(bundle_path, nthread=nthread)
+
+
+def score_chunk(rows: list[dict]) -> tuple[list[float | None], list[str]]:
+    """Predict prices for scraped rows, encoded column-wise, one XGBoost call per chunk.
+
+    Rows that can't be encoded (e.g. a district unknown to the model) get no
+    price and the reason in the error list.
+    """
+    columns, errors = listings_to_columns(rows)
+    data_array, encode_errors = _artifact.encoder.encode_columns(columns)
+    errors = np.where(errors == "", encode_errors, errors)
+    valid = errors == ""
+
+    prices: list[float | None] = [None] * len(rows)
+    if valid.any():
+        for i, price in zip(np.flatnonzero(valid), _artifact.predict(data_array[valid])):
+            prices[i] = float(price)
+    return prices, errors.tolist()
+
+
+def _chunks(reader, chunk_size: int):
+    while chunk := list(itertools.islice(reader, chunk_size)):
+        yield chunk
+
+
+def _scored_chunks(chunks, args):
+    """Yield (rows, prices, errors) in input order."""
+    if args.workers <= 1:
+        _init_scorer(args.bundle, args.nthread)
+        for rows in chunks:
+            yield rows, *score_chunk(rows)
+        return
+
+    nthread = args.nthread or max(1, (os.cpu_count() or 1) // args.workers)
+    with ProcessPoolExecutor(
+        args.workers, initializer=_init_scorer, initargs=(args.bundle, nthread)
+    ) as executor:
+        # Bounded number of chunks in flight keeps memory flat
+        pending = deque()
+        for rows in chunks:
+            pending.append((rows, executor.submit(score_chunk, rows)))
+            if len(pending) >= 2 * args.workers:
+                rows, future = pending.popleft()
+                yield rows, *future.result()
+        while pending:
+            rows, future = pending.popleft()
+            yield rows, *future.result()
+
+
+def score_file(args) -> tuple[int, int]:
+    """Score the input file. Returns (rows read, rows without a price)."""
+    total = failed = 0
+    start = time.perf_counter()
+    with open(args.input, newline="", encoding="utf-8") as f_in, open(
+        args.output, "w", newline="", encoding="utf-8"
+    ) as f_out:
+        reader = csv.DictReader(f_in)
+        fieldnames = [
+            name for name in reader.fieldnames or [] if name not in (PRICE_COLUMN, ERROR_COLUMN)
+        ]
+        writer = csv.DictWriter(
+            f_out, fieldnames=fieldnames + [PRICE_COLUMN, ERROR_COLUMN], extrasaction="ignore"
+        )
+        writer.writeheader()
+
+        for rows, prices, errors in _scored_chunks(_chunks(reader, args.chunk_size), args):
+            for row, price, error in zip(rows, prices, errors):
+                row[PRICE_COLUMN] = "" if price is None else round(price)
+                row[ERROR_COLUMN] = error
+                failed += price is None
+            writer.writerows(rows)
+            total += len(rows)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{total} rows, {total / elapsed:.0f} rows/s",
+                file=sys.stderr,
+            )
+    return total, failed
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Score scraped listings in bulk.")
+    parser.add_argument("input", type=str, help="CSV file written by the scrapper")
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="predictions.csv",
+        help="output file name (default: predictions.csv)",
+    )
+    parser.add_argument(
+        "--bundle",
+        type=str,
+        default=os.environ.get(
+            "WYCENAPPKA_MODEL_BUNDLE", "../model/out/krakow_bundle.zip"
+        ),
+        help="model bundle to score with",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=10_000, help="rows per chunk (default: 10000)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processes scoring chunks in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--nthread",
+        type=int,
+        default=None,
+        help="XGBoost threads per process (default: all cores / workers)",
+    )
+    return parser
+
+
+def main():
+    args = create_parser().parse_args()
+
+    start = time.perf_counter()
+    total, failed = score_file(args)
+    elapsed = time.perf_counter() - start
+
+    print(f"Scored {total - failed} of {total} rows in {elapsed:.1f}s")
+    if elapsed:
+        print(f"Throughput: {total / elapsed:.0f} rows/s")
+    if failed:
+        print(f"{failed} rows couldn't be scored, see the '{ERROR_COLUMN}' column")
+    print(f"Predictions saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import datetime
+import hashlib
+import json
+import pickle
+import zipfile
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+# Bundle layout (a zip file):
+#   manifest.json - format version, model version, feature manifest,
+#                   category mappings and preprocessing config
+#   model.ubj     - booster in XGBoost's native binary (UBJSON) format
+#   comparables.npz - (optional) listings for the comparables search
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+BOOSTER_FILE = "model.ubj"
+COMPARABLES_FILE = "comparables.npz"
+
+
+def _to_json_value(value):
+    if isinstance(value, pd.DataFrame):
+        # NaN becomes null
+        return json.loads(value.to_json(orient="records", force_ascii=False))
+    if isinstance(value, (tuple, list)):
+        return [_to_json_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _to_json_value(v) for k, v in value.items()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def load_preprocessing_config(config_filename: str) -> dict:
+    """Read config written by preprocess_data (is_train=True)."""
+    with open(config_filename, "rb") as f:
+        return pickle.load(f)
+
+
+def save_bundle(
+    filename: str,
+    booster: xgb.Booster,
+    category_mappings: dict[str, dict[int, str]],
+    preprocessing_config: dict,
+    city: str,
+    comparables: bytes | None = None,
+) -> str:
+    """Write model, mappings and preprocessing config as one bundle.
+
+    Returns version of the saved model.
+    """
+    features = booster.feature_names
+    feature_types = booster.feature_types
+
+    for feature, feature_type in zip(features, feature_types):
+        if feature_type == "c" and feature not in category_mappings:
+            raise ValueError(f"Missing category mapping for feature '{feature}'")
+    for feature in category_mappings:
+        if feature not in features:
+            raise ValueError(f"Category mapping for unknown feature '{feature}'")
+
+    raw = bytes(booster.save_raw(raw_format="ubj"))
+    digest = hashlib.sha256(raw).hexdigest()
+    created_at = datetime.datetime.now(datetime.timezone.utc)
+    version = f"{city}-{created_at:%Y%m%d%H%M%S}-{digest[:8]}"
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "version": version,
+        "city": city,
+        "created_at": created_at.isoformat(),
+        "xgboost_version": xgb.__version__,
+        "model_sha256": digest,
+        "features": features,
+        "feature_types": feature_types,
+        # Values listed in category code order
+        "category_mappings": {
+            feature: [mapping[code] for code in sorted(mapping)]
+            for feature, mapping in category_mappings.items()
+        },
+        "preprocessing": _to_json_value(preprocessing_config),
+    }
+
+    with zipfile.ZipFile(filename, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(
+            MANIFEST_FILE, json.dumps(manifest, indent=2, ensure_ascii=False)
+        )
+        zf.writestr(BOOSTER_FILE, raw)
+        if comparables is not None:
+            # Already compressed by numpy
+            zf.writestr(COMPARABLES_FILE, comparables, compress_type=zipfile.ZIP_STORED)
+
+    return version
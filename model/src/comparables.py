@@ -0,0 +1,57 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+# Keep in sync with backend/model/comparables.py
+FEATURES = ["location_lat", "location_lon", "area", "rooms", "floor"]
+# How much a feature counts when looking for similar listings
+WEIGHTS = np.array([1.0, 1.0, 1.0, 0.5, 0.25])
+KM_PER_DEGREE_LAT = 111.2
+
+
+def _to_points(values: np.ndarray, km_per_degree: np.ndarray) -> np.ndarray:
+    """Coordinates in km, so that both directions are comparable."""
+    points = np.array(values, dtype=np.float64)
+    points[:, :2] *= km_per_degree
+    return points
+
+
+def build_comparables(data: pd.DataFrame) -> bytes:
+    """Listings for the nearest-neighbour search and statistics, as an .npz file.
+
+    Features are scaled (standard deviation, divided by the weight) at build
+    time, so the backend only builds the tree and queries it.
+    """
+    data = data.dropna(subset=FEATURES + ["price"]).reset_index(drop=True)
+
+    lat0 = data["location_lat"].median()
+    km_per_degree = np.array(
+        [KM_PER_DEGREE_LAT, KM_PER_DEGREE_LAT * np.cos(np.radians(lat0))]
+    )
+    points = _to_points(data[FEATURES].to_numpy(), km_per_degree)
+
+    mean = points.mean(axis=0)
+    std = points.std(axis=0)
+    # Both coordinates use the same scale, otherwise distances get distorted
+    std[:2] = std[:2].mean()
+    scale = np.where(std > 0, std, 1.0) / WEIGHTS
+
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        points=((points - mean) / scale).astype(np.float32),
+        mean=mean,
+        scale=scale,
+        km_per_degree=km_per_degree,
+        price=data["price"].to_numpy(dtype=np.float64),
+        location_lat=data["location_lat"].to_numpy(dtype=np.float64),
+        location_lon=data["location_lon"].to_numpy(dtype=np.float64),
+        area=data["area"].to_numpy(dtype=np.float64),
+        rooms=data["rooms"].to_numpy(dtype=np.int64),
+        floor=data["floor"].to_numpy(dtype=np.int64),
+        district=data["location_district"].astype(str).to_numpy(dtype=str),
+        # Not used in the search, only for district statistics
+        build_year=data["build_year"].to_numpy(dtype=np.float64),
+    )
+    return buffer.getvalue()
@@ -8,6 +8,12 @@ import pickle
 import warnings
 from math import radians, cos, sin, asin, sqrt
 
+from geocoder import build_geocoder
+
+# Centrum Krakowa (Rynek Główny)
+CENTER_LAT = 50.0619474
+CENTER_LON = 19.9368564
+
 
 def _drop_row_if_na(data, col_name):
     data = data.dropna(subset=[col_name])
@@ -76,10 +82,8 @@ def _haversine(lat1, lon1, lat2, lon2):
 
 
 def _add_distance_from_center(data):
-    center_lat = 50.0619474
-    center_lon = 19.9368564
     data["distance_from_center"] = data.apply(
-        lambda row: _haversine(row["location_lat"], row["location_lon"], center_lat, center_lon),
+        lambda row: _haversine(row["location_lat"], row["location_lon"], CENTER_LAT, CENTER_LON),
         axis=1
     )
     return data
@@ -310,6 +314,8 @@ def preprocess_data(
         config["q1_q3"] = _calculate_iqr(data)
         config["q1_q3_m2"] = _calculate_iqr_price_m2(data)
         config["district_median"] = _calculate_median_values(data)
+        # Współrzędne ulic/dzielnic dla backendu (adres z formularza -> lat/lon)
+        config["geocoder"] = build_geocoder(data, (CENTER_LAT, CENTER_LON))
         # Doesn't work
         # config["area_to_rooms_map"], config["area_bins"] = _calculate_rooms_per_area(
         #     data
@@ -381,6 +387,7 @@ def preprocess_data(
 
     extra_columns_to_drop = [
         "available",
+        "date_created",
         "heating_boiler_room",
         "heating_electrical",
         "heating_gas",
@@ -0,0 +1,62 @@
+import ast
+import re
+import unicodedata
+
+import pandas as pd
+
+# Keep in sync with backend/model/geocoder.py
+_PREFIXES = re.compile(r"\b(ul|al|os|pl|ulica|aleja|aleje|osiedle|plac|rondo)\b\.?")
+_NUMBERS = re.compile(r"\b\d+\w*(/\d+\w*)?\b")
+
+
+def normalize_place(name: str) -> str:
+    """Street or area name as used in the geocoder tables, e.g. "ul. Łobzowska 12" -> "lobzowska"."""
+    name = name.lower().replace("ł", "l")
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    name = _NUMBERS.sub(" ", _PREFIXES.sub(" ", name))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name).split())
+
+
+def _location_list(value) -> list:
+    if isinstance(value, list):
+        return value
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def build_geocoder(data: pd.DataFrame, center: tuple[float, float]) -> dict:
+    """Median coordinates of scraped listings per district and per street/area.
+
+    `location` is a list like ['Łobzów', 'Krowodrza', 'Kraków', 'małopolskie'],
+    the first item is the street or area, the second one the district (see
+    add_district.py).
+    """
+    locations = data["location"].apply(_location_list)
+    points = pd.DataFrame(
+        {
+            "district": locations.apply(lambda x: x[1] if len(x) > 1 else None),
+            "place": locations.apply(lambda x: normalize_place(x[0]) if x else ""),
+            "lat": data["location_lat"],
+            "lon": data["location_lon"],
+        }
+    ).dropna()
+
+    districts = points.groupby("district")[["lat", "lon"]].median()
+    places = points[points["place"] != ""].groupby(["district", "place"])[
+        ["lat", "lon"]
+    ].median()
+
+    geocoder = {
+        "center": list(center),
+        "districts": {
+            district: [row.lat, row.lon] for district, row in districts.iterrows()
+        },
+        "places": {},
+    }
+    for (district, place), row in places.iterrows():
+        geocoder["places"].setdefault(district, {})[place] = [row.lat, row.lon]
+    return geocoder
@@ -6,6 +6,9 @@ from sklearn.metrics import mean_squared_error, r2_score
 from sklearn.model_selection import GridSearchCV
 import numpy as np
 
+from bundle import load_preprocessing_config, save_bundle
+from comparables import build_comparables
+
 
 def convert_str_to_category(
     train: pd.DataFrame, test: pd.DataFrame, city_name="otodom"
@@ -81,6 +84,22 @@ def run(filename: str = "otodom"):
 
     print("✅ Model XGBoost został wytrenowany i zapisany do pliku!")
 
+    # Paczka dla backendu: model w formacie XGBoost + mapowania + konfiguracja
+    category_mappings = {
+        col: dict(enumerate(X_train[col].cat.categories))
+        for col in X_train.select_dtypes(include=["category"]).columns
+    }
+    version = save_bundle(
+        f"../out/{filename}_bundle.zip",
+        model_grid.best_estimator_.get_booster(),
+        category_mappings,
+        load_preprocessing_config(f"../data/{filename}.pkl"),
+        city=filename,
+        # Podobne ogłoszenia (k-NN) z danych treningowych i testowych
+        comparables=build_comparables(pd.concat([train_data, test_data])),
+    )
+    print(f"✅ Paczka modelu zapisana (wersja {version})")
+
 
 if __name__ == "__main__":
 
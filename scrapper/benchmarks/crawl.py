@@ -0,0 +1,243 @@
+"""Crawl benchmark against a local server serving synthetic otodom pages.
+
+The server adds a delay to every response (network round trip) and to
+every new connection (TCP + TLS handshake), so sequential and concurrent
+crawls, and fresh versus pooled connections, can be compared offline.
+With --capacity it answers 429 (Retry-After: 1) above that many requests
+per second, with --error-rate some responses are 502, to see how the rate
+limiter adapts and whether listings get lost. The listings of every run
+are checked to be the same.
+
+With --changed the pages are crawled once more on top of the first result,
+after that fraction of listings changed price, to count the requests of an
+incremental crawl (only changed listings should be fetched again).
+
+Run from the scrapper directory:
+
+    $ python -m benchmarks.crawl --pages 3 --concurrency 0 1 4 16
+    $ python -m benchmarks.crawl --pages 3 --concurrency 4 --changed 0.1
+"""
+
+import argparse
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import requests
+
+import scraping_utils
+from benchmarks.fixtures import ITEMS_PER_PAGE, listing_page, search_page
+from fetcher import DEFAULT_HEADERS, Fetcher
+
+
+class FakeOtodom(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.3
+    handshake = 0.15
+    capacity = 0
+    error_rate = 0.0
+    requests = 0
+    connections = 0
+    refused = 0
+    _recent: deque = deque()
+    # Pages rendered in advance, so the server takes no CPU from the crawler
+    pages: dict[str, bytes] = {}
+    _lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with self._lock:
+            FakeOtodom.connections += 1
+        time.sleep(self.handshake)
+
+    def _refuse(self) -> bool:
+        with self._lock:
+            FakeOtodom.requests += 1
+            now = time.monotonic()
+            while self._recent and self._recent[0] < now - 1:
+                self._recent.popleft()
+            if self.capacity and len(self._recent) >= self.capacity:
+                FakeOtodom.refused += 1
+                return True
+            self._recent.append(now)
+            return False
+
+    def _send_error(self, status: int, headers: dict):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        if self._refuse():
+            self._send_error(429, {"Retry-After": "1"})
+            return
+        body = self.pages[self.path]
+        time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            self._send_error(502, {})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def render_pages(pages: int, changed: float = 0.0) -> dict[str, bytes]:
+    rendered = {}
+    for page in range(1, pages + 1):
+        body = search_page(page, changed=changed)
+        rendered[f"/pl/wyniki/sprzedaz/mieszkanie?page={page}"] = body
+        for slug in re.findall(rb'"slug": "([^"]+)"', body):
+            slug = slug.decode()
+            rendered[f"/pl/oferta/{slug}"] = listing_page(slug, changed=changed)
+            # The scrapper asks for "ID" also for "ID." links
+            rendered[f"/pl/oferta/{slug.replace('ID.', 'ID')}"] = rendered[f"/pl/oferta/{slug}"]
+    return rendered
+
+
+def serve() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOtodom)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    scraping_utils.BASE_URL = base_url
+    scraping_utils.SEARCH_URL = f"{base_url}/pl/wyniki/sprzedaz/mieszkanie?page="
+    return server
+
+
+class FreshConnectionFetcher(Fetcher):
+    """Previous behaviour: requests.get, a new connection for every page."""
+
+    def get(self, url: str) -> requests.Response:
+        res = requests.get(url, headers=DEFAULT_HEADERS, timeout=self.timeout)
+        res.raise_for_status()
+        return res
+
+
+def _legacy_page(i: int, fetcher: Fetcher) -> pd.DataFrame:
+    try:
+        return scraping_utils.get_one_search_page(i, pd.DataFrame(), fetcher=fetcher)
+    except Exception as e:
+        print(f"Failed to process page {i}: {str(e)}")
+        return pd.DataFrame()
+
+
+def crawl(pages: int, concurrency: int) -> tuple[float, pd.DataFrame, int, int]:
+    """Crawl with the given concurrency, 0 means the previous sequential crawl."""
+    FakeOtodom.requests = FakeOtodom.connections = FakeOtodom.refused = 0
+    start = time.perf_counter()
+    if concurrency:
+        df = scraping_utils.get_n_pages(
+            pages, df_prev=pd.DataFrame(), offset=1, concurrency=concurrency
+        )
+    else:
+        fetcher = FreshConnectionFetcher()
+        df = pd.concat([_legacy_page(i, fetcher) for i in range(1, pages + 1)])
+    return time.perf_counter() - start, df, FakeOtodom.requests, FakeOtodom.connections
+
+
+def recrawl(
+    pages: int, concurrency: int, df_prev: pd.DataFrame, changed: float
+) -> tuple[float, pd.DataFrame, int]:
+    """Crawl again on top of `df_prev` after a `changed` fraction of prices changed."""
+    FakeOtodom.pages = render_pages(pages, changed)
+    FakeOtodom.requests = FakeOtodom.connections = FakeOtodom.refused = 0
+    start = time.perf_counter()
+    df = scraping_utils.get_n_pages(
+        pages, df_prev=df_prev, offset=1, concurrency=max(1, concurrency)
+    )
+    return time.perf_counter() - start, df, FakeOtodom.requests
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark crawling otodom pages.")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[0, 1, 4, 16],
+        help="0 is the previous crawl (sequential, a new connection per page)",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.3, help="seconds added to every response"
+    )
+    parser.add_argument(
+        "--handshake", type=float, default=0.15, help="seconds added to every new connection"
+    )
+    parser.add_argument(
+        "--capacity", type=int, default=0, help="requests/s before 429s (0: no limit)"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction of 502 responses"
+    )
+    parser.add_argument(
+        "--changed",
+        type=float,
+        default=None,
+        help="crawl again after this fraction of listings changed price",
+    )
+    return parser
+
+
+def main():
+    args = create_parser().parse_args()
+    FakeOtodom.latency = args.latency
+    FakeOtodom.handshake = args.handshake
+    FakeOtodom.capacity = args.capacity
+    FakeOtodom.error_rate = args.error_rate
+    FakeOtodom.pages = render_pages(args.pages)
+    server = serve()
+
+    results = []
+    for concurrency in args.concurrency:
+        elapsed, df, requests, connections = crawl(args.pages, concurrency)
+        results.append((concurrency, elapsed, df, requests, connections, FakeOtodom.refused))
+    if args.changed is not None:
+        concurrency, _, df_prev, full_requests, *_ = results[-1]
+        recrawled = recrawl(args.pages, concurrency, df_prev, args.changed)
+    server.shutdown()
+
+    # Runs with the new crawler must all give the same listings
+    reference = next((r[2] for r in results if r[0]), results[0][2])
+    reference = reference.drop(columns="scrapped_date")
+    expected = args.pages * ITEMS_PER_PAGE
+    print(
+        f"Pages: {args.pages}, latency {args.latency}s, handshake {args.handshake}s, "
+        f"capacity {args.capacity or '-'} requests/s, error rate {args.error_rate}"
+    )
+    print(
+        f"{'concurrency':>12} {'time':>8} {'listings':>9} {'requests':>9} "
+        f"{'429s':>6} {'conns':>6} {'speedup':>8}"
+    )
+    for concurrency, elapsed, df, requests, connections, refused in results:
+        same = df.drop(columns="scrapped_date").equals(reference)
+        print(
+            f"{concurrency:>12} {elapsed:>7.2f}s {f'{len(df)}/{expected}':>9} {requests:>9} "
+            f"{refused:>6} {connections:>6} {results[0][1] / elapsed:>7.1f}x"
+            f"{'' if same else '  (listings differ!)'}"
+        )
+
+    if args.changed is not None:
+        elapsed, df, requests = recrawled
+        updated = (df["price"] != df_prev.loc[df.index, "price"]).sum()
+        print(
+            f"Recrawl after {args.changed:.0%} of prices changed: {elapsed:.2f}s, "
+            f"{requests} requests (first crawl: {full_requests}), "
+            f"{updated} prices updated, {len(df)} listings"
+        )
+
+
+if __name__ == "__main__":
+    main()
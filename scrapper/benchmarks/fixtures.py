@@ -0,0 +1,162 @@
+"""Synthetic otodom pages for the scrapper benchmarks.
+
+Pages have the same structure as the real ones where the scrapper looks
+(`<script id="__NEXT_DATA__">` with searchAds.items or the ad) and a few
+thousand elements of other markup around it, about the size of a real page.
+"""
+
+import json
+import random
+
+ITEMS_PER_PAGE = 36
+DISTRICTS = ["Krowodrza", "Podgórze", "Stare Miasto", "Nowa Huta", "Dębniki"]
+ROOMS = ["ONE", "TWO", "THREE", "FOUR"]
+
+
+def _slug(page: int, i: int) -> str:
+    # Some otodom links use "ID." and some "ID" before the id
+    separator = "ID." if i % 7 == 0 else "ID"
+    return f"mieszkanie-krakow-{page}-{i}-{separator}{page * 1000 + i:x}"
+
+
+def _listing_values(slug: str, seed: int, changed: float) -> tuple[float, float, int]:
+    """Area, price and rooms of a listing, the same on search and listing pages.
+
+    A `changed` fraction of listings has a lower price, as if the price was
+    cut since the previous crawl.
+    """
+    rng = random.Random(f"{seed}:{slug.replace('ID.', 'ID')}")
+    area = round(rng.uniform(25, 120), 1)
+    price = round(area * rng.uniform(11_000, 22_000), -3)
+    rooms = rng.randint(1, len(ROOMS))
+    if rng.random() < changed:
+        price = round(price * 0.95, -3)
+    return area, price, rooms
+
+
+def _markup(rng: random.Random, elements: int) -> str:
+    """Layout, styles and text similar in volume to a rendered otodom page."""
+    parts = ['<link rel="stylesheet" href="/_next/static/css/app.css">']
+    for i in range(elements // 4):
+        words = " ".join(rng.choice(["Kraków", "mieszkanie", "m²", "zł", "pokoje", "piętro"]) for _ in range(6))
+        parts.append(
+            f'<div class="css-{rng.getrandbits(24):x} e1{i % 9}" data-cy="item-{i}">'
+            f'<span class="css-{rng.getrandbits(24):x}">{words}</span>'
+            f'<a href="/pl/oferta/{i}" class="css-link">więcej</a>'
+            f"<p>{words} &amp; {i}</p></div>"
+        )
+    return "\n".join(parts)
+
+
+def _page(next_data: dict, rng: random.Random, elements: int) -> bytes:
+    payload = json.dumps(next_data, ensure_ascii=False)
+    return (
+        "<!DOCTYPE html><html lang=\"pl\"><head><meta charset=\"utf-8\">"
+        "<title>Otodom</title>"
+        '<script src="/_next/static/chunks/main.js" defer=""></script></head>'
+        f"<body><div id=\"__next\">{_markup(rng, elements)}</div>"
+        f'<script id="__NEXT_DATA__" type="application/json">{payload}</script>'
+        "</body></html>"
+    ).encode("utf-8")
+
+
+def search_item(
+    page: int, i: int, rng: random.Random, seed: int = 0, changed: float = 0.0
+) -> dict:
+    slug = _slug(page, i)
+    area, price, rooms = _listing_values(slug, seed, changed)
+    return {
+        "id": page * 1000 + i,
+        "title": f"Mieszkanie {area} m² Kraków",
+        "slug": slug,
+        "estate": "FLAT",
+        "transaction": "SELL",
+        "location": {
+            "address": {"city": {"name": "Kraków"}, "street": {"name": "Lea"}},
+            "reverseGeocoding": {
+                "locations": [
+                    {"fullName": "Kraków, małopolskie"},
+                    {"fullName": f"{rng.choice(DISTRICTS)}, Kraków, małopolskie"},
+                ]
+            },
+            "coordinates": {
+                "latitude": round(50.06 + rng.uniform(-0.05, 0.05), 6),
+                "longitude": round(19.94 + rng.uniform(-0.08, 0.08), 6),
+            },
+        },
+        "images": [
+            {"medium": f"https://img.otodom.pl/{page}/{i}/{k}.webp"} for k in range(5)
+        ],
+        "isPrivateOwner": rng.random() < 0.3,
+        "totalPrice": {"value": price, "currency": "PLN"},
+        "pricePerSquareMeter": {"value": round(price / area), "currency": "PLN"},
+        "areaInSquareMeters": area,
+        "roomsNumber": ROOMS[rooms - 1],
+        "floorNumber": "FIRST",
+        "dateCreated": f"2025-03-{1 + i % 28:02d} 10:00:00",
+        "shortDescription": "Przestronne mieszkanie " * 10,
+    }
+
+
+def search_page(page: int, seed: int = 0, changed: float = 0.0) -> bytes:
+    rng = random.Random(seed * 100_003 + page)
+    items = [search_item(page, i, rng, seed, changed) for i in range(ITEMS_PER_PAGE)]
+    next_data = {
+        "props": {
+            "pageProps": {
+                "data": {
+                    "searchAds": {
+                        "items": items,
+                        "pagination": {"page": page, "itemsPerPage": ITEMS_PER_PAGE},
+                    }
+                }
+            }
+        },
+        "page": "/[lang]/wyniki/[[...searchingCriteria]]",
+    }
+    return _page(next_data, rng, elements=3000)
+
+
+def listing_page(slug: str, seed: int = 0, changed: float = 0.0) -> bytes:
+    rng = random.Random(f"{seed}:{slug}")
+    area, price, rooms = _listing_values(slug, seed, changed)
+    ad = {
+        "id": rng.getrandbits(26),
+        "title": f"Mieszkanie {area} m² Kraków",
+        "slug": slug,
+        "advertiserType": rng.choice(["private", "agency"]),
+        "features": ["balkon", "winda", "piwnica"][: rng.randint(0, 3)],
+        "description": "<p>Opis mieszkania.</p>" * 40,
+        "target": {
+            "Price": price,
+            "Area": str(area),
+            "Rooms_num": [str(rooms)],
+            "Build_year": str(rng.randint(1950, 2024)),
+            "Heating": ["urban"],
+            "Floor_no": [f"floor_{rng.randint(0, 8)}"],
+            "Building_floors_num": str(rng.randint(2, 10)),
+            "Construction_status": ["ready_to_use"],
+            "MarketType": "secondary",
+            "Building_ownership": ["full_ownership"],
+        },
+        "location": {
+            "coordinates": {
+                "latitude": 50.06 + rng.uniform(-0.05, 0.05),
+                "longitude": 19.94 + rng.uniform(-0.08, 0.08),
+            },
+            "reverseGeocoding": {
+                "locations": [
+                    {
+                        "fullNameItems": [
+                            "Kraków",
+                            rng.choice(DISTRICTS),
+                            "małopolskie",
+                        ]
+                    }
+                ]
+            },
+        },
+        "images": [{"large": f"https://img.otodom.pl/{slug}/{k}.webp"} for k in range(20)],
+    }
+    next_data = {"props": {"pageProps": {"ad": ad}}, "page": "/[lang]/ad/[slug]"}
+    return _page(next_data, rng, elements=2000)
@@ -0,0 +1,97 @@
+"""Benchmark of the binned KDE (price_heatmap.py) against gaussian_kde.
+
+gaussian_kde is what notebooks/heatmap.py used: every grid point is
+compared with every listing. Points come from a scraped CSV if given,
+otherwise they are generated around the centre of Kraków.
+
+Run from the scrapper directory:
+
+    $ python -m benchmarks.heatmap --sizes 1000 10000
+    $ python -m benchmarks.heatmap --input otodom.csv
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.stats import gaussian_kde
+
+from price_heatmap import COLUMNS, KRAKOW_BBOX, BinnedKDE, price_per_sqm
+
+
+def synthetic_listings(n: int, seed: int = 0) -> pd.DataFrame:
+    """Listings in a few clusters, denser and more expensive in the centre."""
+    rng = np.random.default_rng(seed)
+    centres = np.array([[50.0619, 19.9369], [50.09, 19.98], [50.02, 19.90], [50.08, 20.03]])
+    cluster = rng.integers(len(centres), size=n)
+    spread = np.where(cluster == 0, 0.015, 0.03)[:, None]
+    lat, lon = (centres[cluster] + rng.normal(size=(n, 2)) * spread).T
+    price_per_sqm = rng.normal(16_000, 3_000, size=n) - 40_000 * np.hypot(
+        lat - centres[0, 0], lon - centres[0, 1]
+    )
+    area = rng.uniform(25, 120, size=n)
+    return pd.DataFrame(
+        {
+            "price": np.maximum(price_per_sqm, 4_000) * area,
+            "area": area,
+            "location_lat": lat,
+            "location_lon": lon,
+        }
+    )
+
+
+def scipy_density(data: pd.DataFrame, points: int) -> np.ndarray:
+    """Density as computed by notebooks/heatmap.py, (lat, lon) grid."""
+    north, west, south, east = KRAKOW_BBOX
+    x_grid, y_grid = np.mgrid[west : east : points * 1j, south : north : points * 1j]
+    positions = np.vstack([x_grid.ravel(), y_grid.ravel()])
+    values = np.vstack([data["location_lon"], data["location_lat"]])
+    kernel = gaussian_kde(values, weights=data["price_per_sqm"].to_numpy())
+    return kernel(positions).reshape(points, points).T
+
+
+def binned_density(data: pd.DataFrame, points: int) -> np.ndarray:
+    kde = BinnedKDE(KRAKOW_BBOX, points, points)
+    kde.add(data["location_lon"], data["location_lat"], data["price_per_sqm"])
+    return kde.density()
+
+
+def _timed(fn, *args) -> tuple[float, np.ndarray]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark heatmap KDE.")
+    parser.add_argument(
+        "--input", type=str, default=None, help="scraped CSV instead of synthetic points"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 20_000])
+    parser.add_argument("--points", type=int, default=200)
+    return parser
+
+
+def main():
+    args = create_parser().parse_args()
+    if args.input:
+        datasets = [price_per_sqm(pd.read_csv(args.input, usecols=COLUMNS))]
+    else:
+        datasets = [price_per_sqm(synthetic_listings(n)) for n in args.sizes]
+
+    print(f"Grid: {args.points}x{args.points}")
+    print(f"{'listings':>10} {'scipy':>10} {'binned':>10} {'speedup':>9} {'max err':>9}")
+    for data in datasets:
+        before, expected = _timed(scipy_density, data, args.points)
+        after, density = _timed(binned_density, data, args.points)
+        # Relative to the peak, differences far from it do not show on the map
+        error = np.abs(density - expected).max() / expected.max()
+        print(
+            f"{len(data):>10} {before:>9.3f}s {after:>9.4f}s "
+            f"{before / after:>8.0f}x {error:>9.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
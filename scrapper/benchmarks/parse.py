@@ -0,0 +1,69 @@
+"""Per-page parse time: BeautifulSoup versus the direct __NEXT_DATA__ path.
+
+Uses the synthetic search and listing pages from benchmarks/fixtures.py,
+or saved pages (e.g. `curl -o page.html <otodom url>`) given with --html.
+
+Run from the scrapper directory:
+
+    $ python -m benchmarks.parse --iterations 20
+    $ python -m benchmarks.parse --html saved/*.html
+"""
+
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import listing_page, search_page
+from scraping_utils import _extract_json_from_script, _page_data
+
+
+def soup_data(content: bytes):
+    """How pages were parsed before: the whole document with html.parser."""
+    return _extract_json_from_script(BeautifulSoup(content.decode("utf-8"), "html.parser"))
+
+
+def _time_per_page(fn, pages: list[bytes], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for page in pages:
+            fn(page)
+    return (time.perf_counter() - start) / (iterations * len(pages))
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark page parsing.")
+    parser.add_argument("--html", type=str, nargs="*", default=[], help="saved pages")
+    parser.add_argument("--pages", type=int, default=5, help="synthetic pages of each kind")
+    parser.add_argument("--iterations", type=int, default=10)
+    return parser
+
+
+def main():
+    args = create_parser().parse_args()
+    if args.html:
+        kinds = {}
+        for path in args.html:
+            with open(path, "rb") as f:
+                kinds[path] = [f.read()]
+    else:
+        kinds = {
+            "search": [search_page(i) for i in range(1, args.pages + 1)],
+            "listing": [listing_page(f"mieszkanie-{i}-ID{i}") for i in range(args.pages)],
+        }
+
+    print(f"{'page':>10} {'size':>9} {'soup':>10} {'direct':>10} {'speedup':>8}")
+    for kind, pages in kinds.items():
+        for page in pages:
+            assert _page_data(page) == soup_data(page), f"Parsers disagree on {kind}"
+        before = _time_per_page(soup_data, pages, args.iterations)
+        after = _time_per_page(_page_data, pages, args.iterations)
+        size = sum(len(page) for page in pages) // len(pages)
+        print(
+            f"{kind:>10} {size / 1024:>7.0f}kB {before * 1e3:>8.2f}ms "
+            f"{after * 1e3:>8.3f}ms {before / after:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -38,6 +38,7 @@ class RealEstateListing:
 
     # Metadata
     scrapped_date: datetime.date = datetime.date.today()
+    date_created: Optional[str] = None  # When the ad was posted (search results)
 
     @property
     def price_per_meter(self) -> Optional[float]:
@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from throttle import RETRY_STATUSES, AdaptiveRateLimiter, backoff, parse_retry_after
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+class Fetcher:
+    """Shared HTTP session for all scraper requests.
+
+    Connections are kept alive and reused (one pool per host, as large as
+    the concurrency), so only the first request to a host pays for the TLS
+    handshake. `map` runs a function over items on `concurrency` threads
+    and returns results in the order of the items, so a concurrent crawl
+    gives the same listings in the same order as a sequential one. At most
+    `per_host` requests go to a single host at once.
+
+    Requests to every host are paced by an AdaptiveRateLimiter starting at
+    `rate` requests/s. Throttling (429), server errors and connection
+    errors are retried up to `retries` times, after Retry-After or a
+    jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 1,
+        per_host: Optional[int] = None,
+        timeout: float = 30,
+        headers: Optional[Dict[str, str]] = None,
+        rate: float = 4.0,
+        max_rate: float = 50.0,
+        retries: int = 5,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host or self.concurrency)
+        self.timeout = timeout
+        self.rate = rate
+        self.max_rate = max_rate
+        self.retries = retries
+        self.retried = 0
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_maxsize=self.concurrency, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self.limiters: Dict[str, AdaptiveRateLimiter] = {}
+        self._hosts_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if self.concurrency > 1:
+            self._executor = ThreadPoolExecutor(
+                self.concurrency, thread_name_prefix="fetcher"
+            )
+
+    def _host_limits(
+        self, url: str
+    ) -> tuple[threading.BoundedSemaphore, AdaptiveRateLimiter]:
+        host = urlsplit(url).netloc
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+                self.limiters[host] = AdaptiveRateLimiter(
+                    rate=self.rate, max_rate=self.max_rate
+                )
+            return self._hosts[host], self.limiters[host]
+
+    def get(self, url: str) -> requests.Response:
+        """GET a page over a pooled connection, raises for HTTP errors.
+
+        Transient errors are retried, the last one is raised.
+        """
+        slots, limiter = self._host_limits(url)
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            limiter.acquire()
+            try:
+                with slots:
+                    start = time.monotonic()
+                    res = self.session.get(url, timeout=self.timeout)
+                    latency = time.monotonic() - start
+            except (requests.ConnectionError, requests.Timeout):
+                if last:
+                    raise
+                limiter.on_throttled()
+                delay = backoff(attempt)
+            else:
+                if res.status_code not in RETRY_STATUSES:
+                    limiter.on_success(latency)
+                    res.raise_for_status()
+                    return res
+                if last:
+                    res.raise_for_status()
+                retry_after = parse_retry_after(res.headers.get("Retry-After"))
+                limiter.on_throttled(retry_after)
+                delay = backoff(attempt) if retry_after is None else retry_after
+            self.retried += 1
+            # Without holding a slot, other pages can be fetched meanwhile
+            time.sleep(delay)
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        """[fn(item) for item in items], run concurrently, in the same order."""
+        if self._executor is None:
+            return [fn(item) for item in items]
+        return list(self._executor.map(fn, items))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.session.close()
+
+    def __enter__(self) -> "Fetcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,257 @@
+"""Price per m² heatmaps of scraped listings.
+
+The density is a weighted Gaussian KDE, the same as scipy.stats.gaussian_kde
+(Scott's rule bandwidth, full covariance of the points), computed on a
+regular grid: points are linearly binned onto the grid in a single pass and
+the bins are convolved with the kernel using FFT. The cost is
+O(points + grid log grid) instead of O(points * grid).
+
+Run from the scrapper directory:
+
+    $ python price_heatmap.py otodom.csv --output heatmap.png
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.signal import fftconvolve
+
+# (north, west), (south, east) of notebooks/krk.png
+KRAKOW_BBOX = (50.144579, 19.757886, 49.972568, 20.120011)
+COLUMNS = ["price", "area", "location_lat", "location_lon"]
+# The kernel is cut off this many standard deviations from its centre
+KERNEL_SIGMAS = 4.0
+
+
+class BinnedKDE:
+    """Weighted Gaussian KDE of (lon, lat) points evaluated on a grid.
+
+    Points can be added in chunks (`add`), only the bins and a few sums for
+    the covariance are kept. Points outside the grid still count for the
+    bandwidth and contribute to the density if they are within `padding`
+    (a fraction of the bounding box size) from it.
+    """
+
+    def __init__(
+        self,
+        bbox: tuple[float, float, float, float] = KRAKOW_BBOX,
+        width: int = 200,
+        height: int = 200,
+        padding: float = 0.25,
+    ):
+        north, west, south, east = bbox
+        self.bbox = bbox
+        self.width, self.height = width, height
+        self._step = np.array([(east - west) / (width - 1), (north - south) / (height - 1)])
+        # Extra cells around the grid, for points just outside of it
+        self._pad = np.ceil(padding * np.array([width - 1, height - 1])).astype(int)
+        self._origin = np.array([west, south]) - self._pad * self._step
+        self._shape = (height + 2 * self._pad[1], width + 2 * self._pad[0])
+        self._bins = np.zeros(self._shape)
+        self._counts = np.zeros(self._shape)
+        # Sums of w, w², w·x and w·x·xᵀ for the covariance, weighted and not
+        self._moments = {
+            weighted: [0.0, 0.0, np.zeros(2), np.zeros((2, 2))] for weighted in (True, False)
+        }
+        self.n = 0
+
+    def add(self, lon: np.ndarray, lat: np.ndarray, weights: np.ndarray | None = None):
+        """Add points, with weights (e.g. price per m²) or 1 each."""
+        points = np.column_stack([lon, lat]).astype(np.float64)
+        weights = np.ones(len(points)) if weights is None else np.asarray(weights, np.float64)
+        self.n += len(points)
+        for w, moments in zip([weights, np.ones(len(points))], self._moments.values()):
+            moments[0] += w.sum()
+            moments[1] += (w**2).sum()
+            moments[2] += w @ points
+            moments[3] += (points * w[:, None]).T @ points
+
+        # Linear binning: every point is split between the 4 nearest grid nodes
+        cell = (points - self._origin) / self._step
+        corner = np.floor(cell).astype(np.int64)
+        frac = cell - corner
+        inside = np.all((corner >= 0) & (corner < np.array(self._shape[::-1]) - 1), axis=1)
+        corner, frac, weights = corner[inside], frac[inside], weights[inside]
+        for dx in (0, 1):
+            for dy in (0, 1):
+                share = np.where(dx, frac[:, 0], 1 - frac[:, 0]) * np.where(
+                    dy, frac[:, 1], 1 - frac[:, 1]
+                )
+                index = (corner[:, 1] + dy) * self._shape[1] + corner[:, 0] + dx
+                size = self._bins.size
+                self._bins += np.bincount(index, weights * share, size).reshape(self._shape)
+                self._counts += np.bincount(index, share, size).reshape(self._shape)
+
+    def covariance(self, weighted: bool = True) -> np.ndarray:
+        """Kernel covariance, as gaussian_kde(...).covariance (Scott's rule)."""
+        if self.n < 2:
+            raise ValueError("At least 2 points are needed to estimate the bandwidth")
+        w, w2, wx, wxx = self._moments[weighted]
+        mean = wx / w
+        # np.cov(aweights=..., bias=False), as in gaussian_kde
+        covariance = (wxx / w - np.outer(mean, mean)) / (1 - w2 / w**2)
+        neff = w**2 / w2
+        factor = neff ** (-1 / (2 + 4))
+        return covariance * factor**2
+
+    def _kernel(self, covariance: np.ndarray) -> np.ndarray:
+        """Gaussian kernel sampled at grid offsets, centred in the array."""
+        sigma = np.sqrt(np.diag(covariance))
+        reach = np.minimum(
+            np.ceil(KERNEL_SIGMAS * sigma / self._step).astype(int),
+            np.array(self._shape[::-1]) - 1,
+        )
+        dx = np.arange(-reach[0], reach[0] + 1) * self._step[0]
+        dy = np.arange(-reach[1], reach[1] + 1) * self._step[1]
+        x, y = np.meshgrid(dx, dy)
+        offsets = np.stack([x.ravel(), y.ravel()])
+        inverse = np.linalg.inv(covariance)
+        energy = np.sum(offsets * (inverse @ offsets), axis=0) / 2
+        norm = 2 * np.pi * np.sqrt(np.linalg.det(covariance))
+        return (np.exp(-energy) / norm).reshape(x.shape)
+
+    def _crop(self, grid: np.ndarray) -> np.ndarray:
+        pad_x, pad_y = self._pad
+        return grid[pad_y : pad_y + self.height, pad_x : pad_x + self.width]
+
+    def density(self) -> np.ndarray:
+        """Weighted density, array (height, width), row 0 is the south edge.
+
+        Approximates gaussian_kde([lon, lat], weights=weights) evaluated at
+        the grid nodes.
+        """
+        kernel = self._kernel(self.covariance())
+        density = self._crop(fftconvolve(self._bins, kernel, mode="same"))
+        # FFT round-off can leave tiny negative values far from the points
+        return np.maximum(density, 0) / self._moments[True][0]
+
+    def mean(self, min_density: float = 1e-3) -> np.ndarray:
+        """Local weighted average of the weights (e.g. price per m²).
+
+        Ratio of the weighted and unweighted density with the same kernel.
+        Cells where the unweighted density is below `min_density` times its
+        maximum (no listings nearby) are NaN.
+        """
+        kernel = self._kernel(self.covariance(weighted=False))
+        total = self._crop(fftconvolve(self._bins, kernel, mode="same"))
+        counts = self._crop(fftconvolve(self._counts, kernel, mode="same"))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = total / counts
+        mean[counts < min_density * counts.max()] = np.nan
+        return mean
+
+
+def price_per_sqm(data: pd.DataFrame) -> pd.DataFrame:
+    """Listings with a location and a valid price per m², as in the notebook."""
+    data = data.assign(price_per_sqm=data["price"] / data["area"])
+    data = data.replace([np.inf, -np.inf], np.nan)
+    return data.dropna(subset=["price_per_sqm", "location_lon", "location_lat"])
+
+
+def heatmap_from_csv(
+    path: str,
+    bbox: tuple[float, float, float, float] = KRAKOW_BBOX,
+    width: int = 200,
+    height: int = 200,
+    chunk_size: int = 100_000,
+) -> BinnedKDE:
+    """BinnedKDE of a scraped CSV, read in chunks so any size fits in memory."""
+    kde = BinnedKDE(bbox, width, height)
+    for chunk in pd.read_csv(path, usecols=COLUMNS, chunksize=chunk_size):
+        chunk = price_per_sqm(chunk)
+        kde.add(chunk["location_lon"], chunk["location_lat"], chunk["price_per_sqm"])
+    return kde
+
+
+def render(
+    grid: np.ndarray,
+    bbox: tuple[float, float, float, float],
+    output: str,
+    title: str,
+    label: str,
+    background: str | None = None,
+):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    north, west, south, east = bbox
+    extent = [west, east, south, north]
+    fig, ax = plt.subplots(figsize=(12, 8))
+    if background:
+        ax.imshow(plt.imread(background), extent=extent)
+    heatmap = ax.imshow(grid, extent=extent, origin="lower", cmap="hot_r", alpha=0.7)
+    fig.colorbar(heatmap, label=label)
+    ax.set_title(title)
+    ax.set_xlabel("Longitude")
+    ax.set_ylabel("Latitude")
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(output, dpi=150)
+    plt.close(fig)
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create argument parser for the heatmap script."""
+    parser = argparse.ArgumentParser(
+        description="Render a price per m² heatmap of scraped listings."
+    )
+    parser.add_argument("input", type=str, help="CSV file written by the scrapper")
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="heatmap.png",
+        help="output image (default: heatmap.png)",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["density", "mean"],
+        default="density",
+        help="density: price weighted density, as in notebooks/heatmap.py; "
+        "mean: local average price per m² (default: density)",
+    )
+    parser.add_argument(
+        "--bbox",
+        type=float,
+        nargs=4,
+        default=KRAKOW_BBOX,
+        metavar=("NORTH", "WEST", "SOUTH", "EAST"),
+        help="area of the map (default: Kraków)",
+    )
+    parser.add_argument(
+        "--points", type=int, default=200, help="grid size per axis (default: 200)"
+    )
+    parser.add_argument(
+        "--background",
+        type=str,
+        default=None,
+        help="map image covering --bbox, e.g. notebooks/krk.png",
+    )
+    return parser
+
+
+def main():
+    """Main entry point for the heatmap CLI."""
+    args = create_parser().parse_args()
+    bbox = tuple(args.bbox)
+
+    start = time.perf_counter()
+    kde = heatmap_from_csv(args.input, bbox, args.points, args.points)
+    if args.mode == "density":
+        grid = kde.density()
+        title, label = "Real Estate Price Density per Square Meter", "Density"
+    else:
+        grid = kde.mean()
+        title, label = "Average Price per Square Meter", "PLN/m²"
+    elapsed = time.perf_counter() - start
+    print(f"{kde.n} listings, {args.points}x{args.points} grid in {elapsed:.2f}s")
+
+    render(grid, bbox, args.output, title, label, args.background)
+    print(f"Heatmap saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
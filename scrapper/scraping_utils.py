@@ -1,16 +1,41 @@
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 import re
 import json
 from typing import Optional, Dict, Any
 from data_types import RealEstateListing
+from fetcher import Fetcher
+from seen_index import SeenIndex, fingerprint, listing_key, normalize_url
 
 BASE_URL = "https://www.otodom.pl"
 CITY = "krakow"
 SEARCH_URL = f"{BASE_URL}/pl/wyniki/sprzedaz/mieszkanie/malopolskie/{CITY}/{CITY}/{CITY}?viewType=listing&page="
 print(SEARCH_URL)
 
+# Used when no fetcher is passed (sequential, one pooled connection)
+DEFAULT_FETCHER = Fetcher()
+
+# roomsNumber of search results -> Rooms_num of listing pages
+ROOMS_NUMBER = {
+    "ONE": "1",
+    "TWO": "2",
+    "THREE": "3",
+    "FOUR": "4",
+    "FIVE": "5",
+    "SIX": "6",
+    "SEVEN": "7",
+    "EIGHT": "8",
+    "NINE": "9",
+    "TEN": "10",
+    "MORE": "more",
+}
+
+# Opening tag of the script with the page data (attributes in any order)
+NEXT_DATA_TAG = re.compile(
+    rb"""<script\b[^>]*?\bid\s*=\s*["']?__NEXT_DATA__(?=["'\s>])[^>]*>""", re.IGNORECASE
+)
+SCRIPT_END = re.compile(rb"</script", re.IGNORECASE)
+
 
 def _extract_json_from_script(
     soup: BeautifulSoup, script_id: str = "__NEXT_DATA__"
@@ -34,8 +59,35 @@ def _extract_json_from_script(
         return None
 
 
-def _extract_ad_data(soup: BeautifulSoup) -> Optional[Dict]:
-    json_data = _extract_json_from_script(soup)
+def _extract_next_data(content: bytes) -> Optional[Dict]:
+    """Parse the __NEXT_DATA__ script straight from the page bytes.
+
+    Returns None if the tag can't be found or its content isn't valid
+    JSON, so the caller can fall back to BeautifulSoup.
+    """
+    match = NEXT_DATA_TAG.search(content)
+    if match is None:
+        return None
+    end = SCRIPT_END.search(content, match.end())
+    if end is None:
+        return None
+    try:
+        return json.loads(content[match.end() : end.start()])
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+
+def _page_data(content: bytes) -> Optional[Dict]:
+    """__NEXT_DATA__ of a page, parsing the whole HTML only if needed."""
+    json_data = _extract_next_data(content)
+    if json_data is None:
+        json_data = _extract_json_from_script(BeautifulSoup(content, "html.parser"))
+        if json_data is not None:
+            print("Warning: __NEXT_DATA__ found only by BeautifulSoup")
+    return json_data
+
+
+def _extract_ad_data(json_data: Optional[Dict]) -> Optional[Dict]:
     if not json_data:
         return None
     return json_data.get("props", {}).get("pageProps", {}).get("ad", {})
@@ -66,12 +118,10 @@ def _save_ad_data_to_file(url: str, ad_data: dict) -> None:
         print(f"Error saving ad_data to file: {str(e)}")
 
 
-def _load_page(url: str) -> BeautifulSoup:
-    """Load and parse a webpage."""
-    res = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
-    res.raise_for_status()
-    soup = BeautifulSoup(res.text, "html.parser")
-    return soup
+def _load_page(url: str, fetcher: Optional[Fetcher] = None) -> Optional[Dict]:
+    """Load a webpage and return its __NEXT_DATA__ JSON (None if not found)."""
+    res = (fetcher or DEFAULT_FETCHER).get(url)
+    return _page_data(res.content)
 
 
 def _extract_number(text: str) -> Optional[float]:
@@ -88,28 +138,60 @@ def _extract_number(text: str) -> Optional[float]:
         return None
 
 
-def get_links_for_search_page(n: int) -> list[str]:
-    """Get all listing links from a search results page."""
+def _search_summary(item: Dict) -> Dict[str, Any]:
+    """Listing fields already available in a search results item."""
+    coordinates = (item.get("location") or {}).get("coordinates") or {}
+    return {
+        "name": item.get("title"),
+        "price": (item.get("totalPrice") or {}).get("value"),
+        "area": item.get("areaInSquareMeters"),
+        "rooms": ROOMS_NUMBER.get(item.get("roomsNumber"), RealEstateListing.MISSING_INFO),
+        "location_lat": coordinates.get("latitude"),
+        "location_lon": coordinates.get("longitude"),
+        "date_created": item.get("dateCreated"),
+    }
+
+
+def get_search_page_items(n: int, fetcher: Optional[Fetcher] = None) -> list[Dict]:
+    """Listings of a search results page, as dicts with the listing `url`,
+    `summary` (fields of RealEstateListing known from the search results)
+    and `fingerprint` of the summary."""
     url = SEARCH_URL + str(n)
     # print(f"Getting links from {url}")
-    soup = _load_page(url)
-    json_data = _extract_json_from_script(soup)
+    json_data = _load_page(url, fetcher)
 
     if json_data:
         try:
             listings = json_data["props"]["pageProps"]["data"]["searchAds"]["items"]
-            return [f"{BASE_URL}/pl/oferta/{listing['slug']}" for listing in listings]
+            items = []
+            for listing in listings:
+                summary = _search_summary(listing)
+                items.append(
+                    {
+                        "url": f"{BASE_URL}/pl/oferta/{listing['slug']}",
+                        "summary": summary,
+                        "fingerprint": fingerprint(
+                            summary["price"], summary["area"], summary["rooms"]
+                        ),
+                    }
+                )
+            return items
         except KeyError as e:
             print(f"Error accessing listing data: {str(e)}")
     return []
 
 
+def get_links_for_search_page(n: int, fetcher: Optional[Fetcher] = None) -> list[str]:
+    """Get all listing links from a search results page."""
+    return [item["url"] for item in get_search_page_items(n, fetcher)]
+
+
 def extract_data(
-    url: str, soup: BeautifulSoup, debug: bool = False
+    url: str, json_data: Optional[Dict], debug: bool = False
 ) -> RealEstateListing:
-    """Extract data from a listing page and return a RealEstateListing instance"""
+    """Extract data from a listing page (its __NEXT_DATA__ JSON) and return a RealEstateListing instance"""
     try:
-        ad_data = _extract_ad_data(soup)
+        ad_data = _extract_ad_data(json_data)
         if not ad_data:
             print(f"Warning: Could not extract ad data from {url}")
             return RealEstateListing.create_empty(url)
@@ -164,29 +246,65 @@ def extract_data(
         return RealEstateListing.create_empty(url)
 
 
-def get_one_search_page(
-    n: int, df_prev: pd.DataFrame, debug: bool = False
-) -> pd.DataFrame:
-    """Get all listings from a single search page and return them as a DataFrame."""
-    links = get_links_for_search_page(n)
-    data_list = []
-    for link in links:
+def _to_fetch(
+    items: list[Dict], seen: SeenIndex, queued: set
+) -> tuple[list[Dict], Dict[str, int]]:
+    """Search results whose listing page has to be fetched: new listings and
+    listings whose summary changed. `queued` (updated) are the listings
+    already handled in this crawl."""
+    to_fetch = []
+    counts = {"new": 0, "changed": 0, "unchanged": 0}
+    for item in items:
         # I'm getting duplicates - URL can end with ID.xxxxx or IDxxxxx
-        link = re.sub(r"ID\.", r"ID", link)
-        if (not df_prev.empty) and (link in df_prev["url"].values):
-            continue
-        if (len(data_list)) and (link in [data.url for data in data_list]):
+        url = normalize_url(item["url"])
+        key = listing_key(url)
+        if key in queued:
             continue
+        queued.add(key)
 
-        print(f"Checking {link}")
-        try:
-            soup = _load_page(link)
-            data = extract_data(link, soup, debug=debug)
-            data_list.append(data)
-        except Exception as e:
-            print(f"Failed to process {link}: {str(e)}")
+        previous = seen.fingerprint(url)
+        if previous is None:
+            counts["new"] += 1
+        elif previous == item["fingerprint"]:
+            counts["unchanged"] += 1
+            continue
+        elif previous == 0:
+            # Scraped before fingerprints were kept, assume it didn't change
+            seen.add(url, item["fingerprint"])
+            counts["unchanged"] += 1
             continue
+        else:
+            counts["changed"] += 1
+        to_fetch.append(dict(item, url=url))
+    return to_fetch, counts
+
 
+def _get_listing(
+    item: Dict, fetcher: Fetcher, seen: SeenIndex, debug: bool = False
+) -> Optional[RealEstateListing]:
+    link = item["url"]
+    print(f"Checking {link}")
+    try:
+        json_data = _load_page(link, fetcher)
+        data = extract_data(link, json_data, debug=debug)
+    except Exception as e:
+        print(f"Failed to process {link}: {str(e)}")
+        return None
+
+    # Search results fill in what the listing page is missing
+    for field, value in item["summary"].items():
+        if value is not None and getattr(data, field) in (None, data.MISSING_INFO):
+            setattr(data, field, value)
+    seen.add(link, item["fingerprint"])
+    return data
+
+
+def _get_listings(
+    items: list[Dict], fetcher: Fetcher, seen: SeenIndex, debug: bool = False
+) -> pd.DataFrame:
+    """Listings of search results (fetched concurrently), in the same order."""
+    results = fetcher.map(lambda item: _get_listing(item, fetcher, seen, debug), items)
+    data_list = [data for data in results if data is not None]
     if not data_list:
         return pd.DataFrame()
 
@@ -195,20 +313,89 @@ def get_one_search_page(
     return df
 
 
+def get_one_search_page(
+    n: int,
+    df_prev: pd.DataFrame,
+    debug: bool = False,
+    fetcher: Optional[Fetcher] = None,
+    seen: Optional[SeenIndex] = None,
+) -> pd.DataFrame:
+    """Get all listings from a single search page and return them as a DataFrame."""
+    fetcher = fetcher or DEFAULT_FETCHER
+    if seen is None:
+        seen = SeenIndex.from_frame(df_prev)
+    items, _ = _to_fetch(get_search_page_items(n, fetcher), seen, set())
+    return _get_listings(items, fetcher, seen, debug=debug)
+
+
 def get_n_pages(
-    n: int, df_prev: pd.DataFrame, offset: int = 0, debug: bool = False
+    n: int,
+    df_prev: pd.DataFrame,
+    offset: int = 0,
+    debug: bool = False,
+    concurrency: int = 1,
+    per_host: Optional[int] = None,
+    rate: float = 4.0,
+    max_rate: float = 50.0,
+    retries: int = 5,
+    seen: Optional[SeenIndex] = None,
 ) -> pd.DataFrame:
-    """Get listings from multiple pages and combine them into a single DataFrame."""
-    df = df_prev
-    for i in range(offset, offset + n):
-        print(f"\nProcessing page {i} of {offset + n -1}")
-        page_df = get_one_search_page(i, df_prev, debug=debug)
-        if df.empty:
-            df = page_df
-        elif not page_df.empty:
-            # TODO: I'm getting a warning here: FutureWarning: The behavior of DataFrame concatenation with empty or all-NA entries is deprecated
-            page_df = page_df.dropna(axis=1, how="all")
-            df = pd.concat([df, page_df], ignore_index=False)
-        else:
-            print(f"No (new) data found on page {i}")
-    return df
+    """Get listings from multiple pages and combine them into a single DataFrame.
+
+    With `concurrency` > 1 search pages and then listings are fetched in
+    parallel (at most `per_host` requests to otodom at once). Links are
+    deduplicated in page order before fetching, so the result is the same
+    as with a sequential crawl.
+
+    Listing pages are fetched only for new listings and for listings whose
+    price, area or rooms in the search results changed since they were
+    scraped. Changed listings replace their previous rows.
+
+    Requests are rate limited, starting at `rate` requests/s and adapting
+    to what the site tolerates, failed requests are retried `retries` times.
+
+    `seen` are the listings scraped before (built from `df_prev` if not
+    given), scraped listings are added to it.
+    """
+    if seen is None:
+        seen = SeenIndex.from_frame(df_prev)
+    pages = list(range(offset, offset + n))
+    fetcher = Fetcher(
+        concurrency, per_host, rate=rate, max_rate=max_rate, retries=retries
+    )
+    with fetcher:
+        print(f"\nGetting links from pages {offset} to {offset + n - 1}")
+        page_items = fetcher.map(lambda i: get_search_page_items(i, fetcher), pages)
+
+        items = []
+        queued = set()
+        total = {"new": 0, "changed": 0, "unchanged": 0}
+        for i, page in zip(pages, page_items):
+            to_fetch, counts = _to_fetch(page, seen, queued)
+            if not to_fetch:
+                print(f"No (new) data found on page {i}")
+            items.extend(to_fetch)
+            for name, count in counts.items():
+                total[name] += count
+
+        print(
+            f"\nProcessing {total['new']} new and {total['changed']} changed listings "
+            f"({total['unchanged']} unchanged skipped)"
+        )
+        new_df = _get_listings(items, fetcher, seen, debug=debug)
+
+    for host, limiter in fetcher.limiters.items():
+        print(
+            f"{host}: {limiter.rate:.1f} requests/s at the end, "
+            f"{limiter.throttled} throttled, {fetcher.retried} retried in total"
+        )
+
+    if df_prev.empty:
+        return new_df
+    if new_df.empty:
+        return df_prev
+    # Changed listings were scraped again, keep only the new rows
+    df_prev = df_prev[~df_prev.index.isin(new_df.index)]
+    # TODO: I'm getting a warning here: FutureWarning: The behavior of DataFrame concatenation with empty or all-NA entries is deprecated
+    new_df = new_df.dropna(axis=1, how="all")
+    return pd.concat([df_prev, new_df], ignore_index=False)
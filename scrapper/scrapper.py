@@ -1,5 +1,6 @@
 import argparse
 from scraping_utils import get_n_pages
+from seen_index import SeenIndex
 import pandas as pd
 
 
@@ -18,6 +19,36 @@ def create_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--offset", type=int, default=1, help="page number to start from (default: 1)"
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="number of pages fetched in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=None,
+        help="max parallel requests to one host (default: --concurrency)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=4.0,
+        help="initial requests per second, adapts to the site (default: 4)",
+    )
+    parser.add_argument(
+        "--max-rate",
+        type=float,
+        default=50.0,
+        help="max requests per second (default: 50)",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=5,
+        help="retries of throttled or failed requests (default: 5)",
+    )
     parser.add_argument(
         "--debug",
         action="store_true",
@@ -43,7 +74,21 @@ def main():
     except:
         pass
 
-    df = get_n_pages(args.pages, df_prev=df_prev, offset=args.offset, debug=args.debug)
+    # Listings scraped before, kept next to the output
+    seen = SeenIndex.for_output(args.output, df_prev)
+
+    df = get_n_pages(
+        args.pages,
+        df_prev=df_prev,
+        offset=args.offset,
+        debug=args.debug,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        rate=args.rate,
+        max_rate=args.max_rate,
+        retries=args.retries,
+        seen=seen,
+    )
 
     if df.empty:
         print(
@@ -52,6 +97,7 @@ def main():
         return
 
     df.to_csv(args.output)
+    seen.save(args.output)
     print(f"\nScraping completed. Found {len(df)} listings.")
     print(f"Data saved to {args.output}")
 
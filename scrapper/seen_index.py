@@ -0,0 +1,137 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+
+def normalize_url(url: str) -> str:
+    """Listing URL without the "ID." variant (links can end with ID.xxxxx or IDxxxxx)."""
+    return re.sub(r"ID\.", r"ID", url.split("?", 1)[0].split("#", 1)[0])
+
+
+def _hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def listing_key(url: str) -> int:
+    """Stable 64-bit hash of the normalized slug of a listing URL."""
+    return _hash(normalize_url(url).rstrip("/").rsplit("/", 1)[-1])
+
+
+def _rounded(value, digits: int) -> Optional[float]:
+    try:
+        return round(float(value), digits)
+    except (TypeError, ValueError):
+        return None
+
+
+def fingerprint(price, area, rooms) -> int:
+    """Hash of the fields shown in search results, to notice changed listings.
+
+    Values are normalized, so the same listing gives the same fingerprint
+    from search results and from a row of the CSV. Never 0, which stands
+    for "unknown".
+    """
+    rooms = str(rooms) if rooms is not None and str(rooms) != "nan" else None
+    return _hash(repr((_rounded(price, 0), _rounded(area, 2), rooms))) or 1
+
+
+def _stamp(csv_path: str) -> Optional[np.ndarray]:
+    try:
+        stat = os.stat(csv_path)
+    except OSError:
+        return None
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+class SeenIndex:
+    """Hashes of the listings already scraped, for O(1) deduplication.
+
+    For every listing it also keeps the fingerprint of its summary in the
+    search results (0 if unknown), to fetch again only listings that changed.
+
+    Saved next to the output CSV (`<output>.seen.npz`) together with the
+    size and modification time of the CSV at that moment. On the next run
+    it is loaded as is if the CSV hasn't changed since, otherwise it is
+    rebuilt from the CSV URLs. Listings are added once scraped and the
+    index is saved after the CSV, so a crawl that fails before writing its
+    results doesn't mark anything as seen.
+    """
+
+    def __init__(self, keys: Optional[Dict[int, int]] = None, path: Optional[str] = None):
+        self.path = path
+        # Listing key -> fingerprint
+        self._listings: Dict[int, int] = dict(keys or {})
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_urls(
+        cls,
+        urls: Iterable[str],
+        fingerprints: Optional[Iterable[int]] = None,
+        path: Optional[str] = None,
+    ) -> "SeenIndex":
+        keys = [listing_key(url) for url in urls]
+        fingerprints = [0] * len(keys) if fingerprints is None else fingerprints
+        return cls(dict(zip(keys, fingerprints)), path)
+
+    @classmethod
+    def for_output(cls, csv_path: str, df_prev=None) -> "SeenIndex":
+        """Index of the listings in `csv_path` (read before as `df_prev`)."""
+        path = csv_path + ".seen.npz"
+        stamp = _stamp(csv_path)
+        if stamp is not None and os.path.exists(path):
+            with np.load(path) as npz:
+                if np.array_equal(npz["stamp"], stamp):
+                    keys = npz["keys"].tolist()
+                    # Saved before fingerprints were kept
+                    if "fingerprints" in npz.files:
+                        fingerprints = npz["fingerprints"].tolist()
+                    else:
+                        fingerprints = [0] * len(keys)
+                    return cls(dict(zip(keys, fingerprints)), path)
+            print(f"{csv_path} changed since {path} was saved, rebuilding it")
+        return cls.from_frame(df_prev, path)
+
+    @classmethod
+    def from_frame(cls, df, path: Optional[str] = None) -> "SeenIndex":
+        """Index of the listings of a scraped DataFrame (or None)."""
+        if df is None or df.empty:
+            return cls(path=path)
+        fingerprints = [
+            fingerprint(price, area, rooms)
+            for price, area, rooms in zip(df["price"], df["area"], df["rooms"])
+        ]
+        return cls.from_urls(df["url"], fingerprints, path)
+
+    def __contains__(self, url: str) -> bool:
+        return listing_key(url) in self._listings
+
+    def __len__(self) -> int:
+        return len(self._listings)
+
+    def fingerprint(self, url: str) -> Optional[int]:
+        """Fingerprint the listing was scraped with, None if not seen."""
+        return self._listings.get(listing_key(url))
+
+    def add(self, url: str, fingerprint: int = 0) -> None:
+        key = listing_key(url)
+        with self._lock:
+            self._listings[key] = fingerprint
+
+    def save(self, csv_path: str) -> None:
+        """Save the index, to be called right after writing `csv_path`."""
+        if self.path is None:
+            return
+        with self._lock:
+            keys = np.fromiter(self._listings, dtype=np.uint64, count=len(self._listings))
+            fingerprints = np.fromiter(
+                self._listings.values(), dtype=np.uint64, count=len(self._listings)
+            )
+        # np.savez adds .npz to names without it
+        tmp_path = self.path[: -len(".npz")] + ".tmp.npz"
+        np.savez(tmp_path, keys=keys, fingerprints=fingerprints, stamp=_stamp(csv_path))
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,117 @@
+import email.utils
+import random
+import threading
+import time
+from typing import Optional
+
+# Statuses worth retrying: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (seconds or an HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+def backoff(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter: random in [0, base * 2^attempt]."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class AdaptiveRateLimiter:
+    """Token bucket whose rate adapts to how much the site tolerates (AIMD).
+
+    The rate starts at `rate` requests/s and doubles every second (slow
+    start) until the first sign of overload, then grows by `increase`
+    requests/s every second. It only grows while requests actually wait for
+    tokens, i.e. when the limiter is what holds the crawl back. A 429/5xx
+    cuts the rate by `decrease`, and so does latency rising above
+    `latency_factor` times the lowest latency seen (a queue building up on
+    the server), at most once per `cooldown` seconds. A Retry-After pauses
+    all requests for that long.
+    """
+
+    def __init__(
+        self,
+        rate: float = 4.0,
+        min_rate: float = 0.2,
+        max_rate: float = 50.0,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_factor: float = 3.0,
+        cooldown: float = 2.0,
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.slow_start = True
+        self.throttled = 0
+
+        self._lock = threading.Lock()
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._last_wait = 0.0
+        self._latency: Optional[float] = None
+        self._min_latency: Optional[float] = None
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(1.0, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+                self._last_wait = now
+            time.sleep(wait)
+
+    def _decrease(self, factor: float) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.slow_start = False
+        self.rate = max(self.min_rate, self.rate * factor)
+
+    def on_success(self, latency: float) -> None:
+        with self._lock:
+            # Moving average, and the lowest one as the unloaded latency
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            if self._min_latency is None or self._latency < self._min_latency:
+                self._min_latency = self._latency
+            if self._latency > self.latency_factor * self._min_latency:
+                self._decrease(self.decrease)
+            elif time.monotonic() - self._last_wait < 1.0:
+                # Per request, so about +rate (slow start) or +increase per second
+                step = 1.0 if self.slow_start else self.increase / self.rate
+                self.rate = min(self.max_rate, self.rate + step)
+
+    def on_throttled(self, retry_after: Optional[float] = None) -> None:
+        """The site refused a request (429/5xx)."""
+        with self._lock:
+            self.throttled += 1
+            self._decrease(self.decrease)
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)